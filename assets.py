@@ -0,0 +1,189 @@
+"""Post-render output for build.py: the shared stylesheet, HTML minification and precompressed siblings.
+
+The weekly menu CSS and the styles that used to be repeated inline on every broadcaster row,
+channel pill and stats row live in one stylesheet, written once per build under a content-hashed
+name (assets/site.<hash>.css) so browsers and CDNs can cache it indefinitely. Each template keeps
+its own small <style> block inline, as critical CSS for the first paint.
+
+Pages are minified on write. With --precompress, every page, the stylesheet and the sitemap also
+get .gz (and .br, if the brotli module is installed) siblings for hosts that serve precompressed
+files; GitHub Pages compresses on the fly and does not need them.
+"""
+import gzip
+import hashlib
+import os
+import re
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ASSETS_DIR = "assets"
+
+SITE_CSS = '''
+/* Weekly date menu (day pages) */
+.weekly-menu-container {
+    display: flex;
+    width: 100%;
+    gap: 4px;
+    padding: 10px 5px;
+    box-sizing: border-box;
+    justify-content: space-between;
+}
+.date-btn {
+    flex: 1;
+    display: flex;
+    flex-direction: column;
+    align-items: center;
+    justify-content: center;
+    padding: 8px 2px;
+    text-decoration: none;
+    border-radius: 6px;
+    background: #fff;
+    border: 1px solid #e2e8f0;
+    min-width: 0;
+    transition: all 0.2s;
+}
+.date-btn div { font-size: 9px; text-transform: uppercase; color: #64748b; font-weight: bold; }
+.date-btn b { font-size: 10px; color: #1e293b; white-space: nowrap; }
+.date-btn.active { background: #2563eb; border-color: #2563eb; }
+.date-btn.active div, .date-btn.active b { color: #fff; }
+
+@media (max-width: 480px) {
+    .date-btn b { font-size: 8px; }
+    .date-btn div { font-size: 7px; }
+    .weekly-menu-container { gap: 2px; padding: 5px 2px; }
+}
+
+/* Day and channel listings */
+.match-row .time-box { min-width: 95px; text-align: center; border-right: 1px solid #edf2f7; margin-right: 10px; }
+.ad-container { margin: 20px 0; text-align: center; }
+
+/* Match page: broadcasters by country */
+.bc-row { display: flex; align-items: flex-start; padding: 12px; border-bottom: 1px solid #edf2f7; background: #fff; }
+.bc-country { flex: 0 0 100px; font-weight: 800; color: #475569; font-size: 13px; padding-top: 4px; }
+.bc-channels { flex: 1; display: flex; flex-wrap: wrap; gap: 4px; }
+.ch-pill { display: inline-block; background: #f1f5f9; color: #2563eb; padding: 2px 8px; border-radius: 4px; margin: 2px; text-decoration: none; font-weight: 600; border: 1px solid #e2e8f0; }
+
+/* Match page: home | label | away rows of the data sections */
+.cmp-row { display: flex; align-items: center; padding: 10px 12px; border-bottom: 1px solid #edf2f7; font-size: 13px; }
+.cmp-home, .cmp-away { flex: 1; font-weight: 700; color: #1e293b; }
+.cmp-label { flex: 1; text-align: center; color: #64748b; font-weight: 600; }
+.cmp-away { text-align: right; }
+'''
+
+
+# --- MINIFICATION ---
+_RAW_BLOCK = re.compile(r'<(script|style|pre|textarea)\b[^>]*>.*?</\1\s*>', re.S | re.I)
+_COMMENT = re.compile(r'<!--(?!\[if).*?-->', re.S)
+_SPACE = re.compile(r'\s+')
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_CSS_PUNCT = re.compile(r'\s*([{};,>])\s*')
+
+
+def _collapse(text):
+    # Whitespace is one space to the HTML renderer; keep a line break where there was one
+    return _SPACE.sub(lambda m: "\n" if "\n" in m.group() else " ", _COMMENT.sub("", text))
+
+
+def minify_css(css):
+    css = _CSS_PUNCT.sub(r'\1', _SPACE.sub(' ', _CSS_COMMENT.sub('', css)))
+    return css.replace(';}', '}').replace(': ', ':').strip()
+
+
+def minify_html(text):
+    """Drop comments and indentation and collapse whitespace; <pre>/<textarea> stay as they are,
+    <style> is minified and <script> only loses its indentation"""
+    out, pos = [], 0
+    for m in _RAW_BLOCK.finditer(text):
+        out.append(_collapse(text[pos:m.start()]))
+        block, tag = m.group(0), m.group(1).lower()
+        if tag == 'style':
+            open_end = block.index('>') + 1
+            close_start = block.rindex('</')
+            block = block[:open_end] + minify_css(block[open_end:close_start]) + block[close_start:]
+        elif tag == 'script' and '`' not in block:
+            # Line breaks stay (no semicolon insertion surprises, // comments end where they did)
+            block = "\n".join(line.strip() for line in block.splitlines() if line.strip())
+        out.append(block)
+        pos = m.end()
+    out.append(_collapse(text[pos:]))
+    return "".join(out).strip() + "\n"
+
+
+# --- SHARED STYLESHEET ---
+STYLESHEET = minify_css(SITE_CSS)
+STYLESHEET_PATH = f"{ASSETS_DIR}/site.{hashlib.sha1(STYLESHEET.encode('utf-8')).hexdigest()[:10]}.css"
+
+
+def stylesheet_link(domain):
+    return f'<link rel="stylesheet" href="{domain}/{STYLESHEET_PATH}">'
+
+
+# --- PRECOMPRESSED SIBLINGS ---
+def encodings():
+    """Sibling suffixes --precompress produces here"""
+    return [".gz", ".br"] if brotli else [".gz"]
+
+
+def compress(data, suffix):
+    if suffix == ".gz":
+        # mtime=0: identical pages give identical .gz files, build after build
+        return gzip.compress(data, 9, mtime=0)
+    if suffix == ".br":
+        return brotli.compress(data, quality=11)
+    raise ValueError(f"unknown encoding {suffix}")
+
+
+def write_siblings(path, data, suffixes):
+    """Write path + suffix for each encoding; returns {suffix: size}"""
+    sizes = {}
+    for suffix in suffixes:
+        encoded = compress(data, suffix)
+        # Written into an unpublished release, no temp file needed
+        with open(path + suffix, "wb") as f:
+            f.write(encoded)
+        sizes[suffix] = len(encoded)
+    return sizes
+
+
+def write_stylesheet(root, suffixes=()):
+    path = os.path.join(root, STYLESHEET_PATH)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = STYLESHEET.encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(data)
+    write_siblings(path, data, suffixes)
+    return path
+
+
+# --- BYTE REPORT ---
+def add_payload(totals, record):
+    """Add one page manifest record to before/after byte totals"""
+    totals["pages"] = totals.get("pages", 0) + 1
+    totals["rendered_bytes"] = totals.get("rendered_bytes", 0) + record.get("raw", record["size"])
+    totals["minified_bytes"] = totals.get("minified_bytes", 0) + record["size"]
+    for suffix, size in record.get("encoded", {}).items():
+        key = f"{suffix[1:]}_bytes"
+        totals[key] = totals.get(key, 0) + size
+    return totals
+
+
+def payload_totals(records):
+    totals = {"pages": 0, "rendered_bytes": 0, "minified_bytes": 0}
+    for record in records:
+        add_payload(totals, record)
+    return totals
+
+
+def describe(totals):
+    def mb(n):
+        return f"{n / 1048576:.1f} MB"
+    before, after = totals["rendered_bytes"], totals["minified_bytes"]
+    saved = f" (-{100 * (before - after) / before:.0f}%)" if before else ""
+    line = f"Output: {totals['pages']} pages, {mb(before)} rendered -> {mb(after)} minified{saved}"
+    for key in ("gz_bytes", "br_bytes"):
+        if key in totals:
+            line += f", {key[:2]} {mb(totals[key])}"
+    return line
@@ -0,0 +1,156 @@
+"""Check http_cache.py against stub_server.py: misses, TTL hits, 304 revalidation and eviction.
+
+    python bench/cache_check.py --api http://127.0.0.1:8765/api/v1
+
+Runs one batch of schedule, TV and lineups URLs through CachedAsyncSession four times: cold (all
+misses), warm (all hits), expired (all revalidated with a 304, no bodies sent) and against a cache
+too small for the batch (entries evicted). The counters of each phase are compared with the
+expected ones; any mismatch is printed and the exit code is 1. Needs only the standard library,
+so bench/run.py runs it as the http_cache scenario even where curl_cffi is not installed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import urllib.error
+import urllib.request
+from datetime import date
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from http_cache import ENDPOINT_TTLS, CachedAsyncSession, ResponseCache  # noqa: E402
+from metrics import RunMetrics  # noqa: E402
+import synthetic  # noqa: E402
+
+
+class Response:
+    def __init__(self, status_code, content, headers):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+
+
+class UrllibSession:
+    """The slice of AsyncSession.get() the cache uses, over urllib in a thread"""
+
+    async def get(self, url, headers=None, **kwargs):
+        def fetch():
+            request = urllib.request.Request(url, headers=headers or {})
+            try:
+                with urllib.request.urlopen(request, timeout=kwargs.get("timeout", 10)) as res:
+                    return Response(res.status, res.read(), res.headers)
+            except urllib.error.HTTPError as e:  # 304s and errors
+                return Response(e.code, e.read(), e.headers)
+        return await asyncio.get_running_loop().run_in_executor(None, fetch)
+
+
+def batch_urls(api, matches_per_day, days=2):
+    start = date.today().toordinal()
+    urls = []
+    for offset in range(days):
+        day = date.fromordinal(start + offset)
+        urls.append(f"{api}/sport/football/scheduled-events/{day.isoformat()}")
+        for mid, _ in synthetic.day_matches(day, matches_per_day):
+            urls.append(f"{api}/tv/event/{mid}/country-channels")
+            urls.append(f"{api}/event/{mid}/lineups")
+    return urls
+
+
+async def fetch_batch(cache, urls):
+    session = CachedAsyncSession(UrllibSession(), cache)
+    responses = await asyncio.gather(*(session.get(url) for url in urls))
+    bad = sum(1 for r in responses if r.status_code != 200 or not r.content)
+    return dict(cache.stats, bad_responses=bad)
+
+
+def run_phase(cache, urls, keep_open=False):
+    """Counters after one pass over urls, plus responses that were not a 200 with a body"""
+    stats = asyncio.run(fetch_batch(cache, urls))
+    if not keep_open:
+        cache.close()
+    return stats
+
+
+def stub_counts(api):
+    with urllib.request.urlopen(api.split("/api/v1")[0] + "/__stats", timeout=10) as res:
+        stats = json.loads(res.read())
+    counts = {}
+    for key, n in stats.items():
+        status = key.rsplit(" ", 1)[1]
+        counts[status] = counts.get(status, 0) + n
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--api", required=True, help="stub server base URL, ending in /api/v1")
+    parser.add_argument("--matches-per-day", type=int, default=50)
+    args = parser.parse_args()
+
+    urls = batch_urls(args.api, args.matches_per_day)
+    n = len(urls)
+    metrics = RunMetrics("http_cache")
+    failures = []
+
+    def expect(phase, stats, **expected):
+        for key, value in expected.items():
+            if stats.get(key) != value:
+                failures.append(f"{phase}: {key} is {stats.get(key)}, expected {value}")
+
+    with tempfile.TemporaryDirectory(prefix="cache-check-") as tmp:
+        path = os.path.join(tmp, "http.sqlite")
+        phases = {}
+
+        with metrics.stage("cold"):
+            before = stub_counts(args.api)
+            phases["cold"] = run_phase(ResponseCache(path), urls)
+        expect("cold", phases["cold"], hits=0, revalidated=0, misses=n, stored=n, evicted=0, bad_responses=0)
+
+        with metrics.stage("warm"):
+            phases["warm"] = run_phase(ResponseCache(path), urls)
+        expect("warm", phases["warm"], hits=n, revalidated=0, misses=0, stored=0, bad_responses=0)
+
+        # A TTL of 0 makes every entry stale: each URL is asked with its validators and gets a 304
+        expired = {family: 0 for family, _, _ in ENDPOINT_TTLS}
+        with metrics.stage("expired"):
+            phases["expired"] = run_phase(ResponseCache(path, ttls=expired), urls)
+            after = stub_counts(args.api)
+        expect("expired", phases["expired"], hits=0, revalidated=n, misses=0, stored=0, bad_responses=0)
+        sent_304 = after.get("304", 0) - before.get("304", 0)
+        if sent_304 != n:
+            failures.append(f"expired: stub sent {sent_304} 304s, expected {n}")
+
+        # Half the size the batch needs: the cache must stay under its limit by evicting
+        cache = ResponseCache(path)
+        total = cache.db.execute("SELECT SUM(size) FROM responses").fetchone()[0]
+        cache.close()
+        small_path = os.path.join(tmp, "small.sqlite")
+        with metrics.stage("evict"):
+            small = ResponseCache(small_path, max_bytes=total // 2)
+            phases["evict"] = run_phase(small, urls, keep_open=True)
+            kept = small.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            small.close()
+        expect("evict", phases["evict"], misses=n, stored=n, bad_responses=0)
+        if not phases["evict"]["evicted"]:
+            failures.append("evict: nothing was evicted")
+        if kept > total // 2:
+            failures.append(f"evict: {kept} bytes kept, limit {total // 2}")
+
+    metrics.count("urls", n)
+    metrics.section("phases", phases)
+    metrics.section("failures", failures)
+    metrics.write()
+    for phase, stats in phases.items():
+        print(f"{phase:8} " + ", ".join(f"{k} {v}" for k, v in stats.items()))
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print(f"{n} URLs: " + ("FAILED" if failures else "ok"))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
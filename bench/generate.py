@@ -0,0 +1,78 @@
+"""Write synthetic date/*.json and data/<endpoint>/*.json at a chosen scale.
+
+    python bench/generate.py --out /tmp/site --matches-per-day 500 --history-days 365
+
+Days run from --history-days ago to --future-days ahead of today, so the build's menu, active
+window and archive see realistic dates. Days older than the archive cut-off are packed like
+`python fixture_files.py --archive` would (unless --no-archive).
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_index import write_indexed  # noqa: E402
+from fixture_files import ARCHIVE_AFTER_DAYS, archive_days, save_fixtures  # noqa: E402
+import synthetic  # noqa: E402
+
+
+def add_scale_args(parser):
+    parser.add_argument("--matches-per-day", type=int, default=200)
+    parser.add_argument("--history-days", type=int, default=30)
+    parser.add_argument("--future-days", type=int, default=7)
+    parser.add_argument("--countries", type=int, default=40, help="size of the country pool")
+    parser.add_argument("--channels", type=int, default=300, help="size of the channel pool")
+    parser.add_argument("--countries-per-match", type=int, default=8)
+    parser.add_argument("--channels-per-country", type=int, default=2)
+    parser.add_argument("--no-data", action="store_true", help="skip data/<endpoint>/ files")
+    parser.add_argument("--no-archive", action="store_true", help="keep every day in date/")
+
+
+def scale_of(args):
+    return {k: getattr(args, k) for k in ("matches_per_day", "history_days", "future_days", "countries", "channels",
+                                          "countries_per_match", "channels_per_country", "no_data", "no_archive")}
+
+
+def generate(out, matches_per_day=200, history_days=30, future_days=7, countries=40, channels=300,
+             countries_per_match=8, channels_per_country=2, no_data=False, no_archive=False, today=None):
+    """Write the synthetic tree under out/; returns the number of matches"""
+    today = today or date.today()
+    date_dir = os.path.join(out, "date")
+    total = 0
+    for offset in range(-history_days, future_days + 1):
+        day = today + timedelta(days=offset)
+        stem = day.strftime("%Y%m%d")
+        scheduled = synthetic.day_matches(day, matches_per_day)
+        save_fixtures(os.path.join(date_dir, f"{stem}.json"), [
+            synthetic.make_fixture(mid, kickoff, countries, channels, countries_per_match, channels_per_country)
+            for mid, kickoff in scheduled])
+        total += len(scheduled)
+        if no_data:
+            continue
+        for endpoint in synthetic.ENDPOINTS:
+            # Lineups and statistics only exist once a match is close or played
+            if endpoint in ("lineups", "statistics") and offset > 0:
+                continue
+            write_indexed(os.path.join(out, "data", endpoint, f"{stem}.json"),
+                          {str(mid): synthetic.make_payload(endpoint, mid) for mid, _ in scheduled})
+
+    if not no_archive:
+        cutoff = (datetime.combine(today, datetime.min.time()) - timedelta(days=ARCHIVE_AFTER_DAYS)).strftime("%Y%m%d")
+        archive_days(cutoff, date_dir=date_dir, archive_dir=os.path.join(date_dir, "archive"))
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--out", default=".", help="directory to write date/ and data/ into")
+    add_scale_args(parser)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    n = generate(args.out, **scale_of(args))
+    print(f"Generated {n} matches in {time.perf_counter() - started:.1f}s under {args.out}")
@@ -0,0 +1,258 @@
+"""Run the build and scraper benchmark scenarios on synthetic data and store the results.
+
+    python bench/run.py --matches-per-day 500 --history-days 90 --label baseline
+    python bench/run.py --only build_full build_incremental_noop
+    python bench/run.py --compare bench/results/A.json bench/results/B.json
+
+Each run copies the repo's scripts and templates into a temporary work tree, fills it with
+generate.py, and runs every scenario as a child process under the same METRICS_DIR reports the
+workflows produce. Wall time and peak RSS come from the child's rusage. Results go to
+bench/results/<UTC time>-<label>.json. The scraper scenarios run ingest.py against stub_server.py
+through SOFASCORE_API and need its dependencies (curl_cffi); they are skipped without them. The
+http_cache scenario (cache_check.py) checks the response cache's hit, 304 and eviction counts
+against the stub with the standard library only, and fails on a mismatch.
+"""
+import argparse
+import glob
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+from generate import add_scale_args, generate, scale_of  # noqa: E402
+from stub_server import add_stub_args  # noqa: E402
+
+RESULTS_DIR = os.path.join(HERE, "results")
+
+BUILD_SCENARIOS = ["build_full", "build_incremental_noop", "build_incremental_change", "build_parallel",
+                   "build_stream"]
+# The old scripts' presets of ingest.py, then one run with every stage
+SCRAPER_SCENARIOS = ["scraper", "future_scraper", "fetch_data", "ingest"]
+SCENARIOS = BUILD_SCENARIOS + SCRAPER_SCENARIOS + ["http_cache"]
+
+
+def run_measured(argv, cwd, env):
+    """Run a child process; returns (exit code, wall seconds, peak RSS in MB, output tail)"""
+    started = time.perf_counter()
+    proc = subprocess.Popen(argv, cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    # Read before waiting so a chatty child cannot block on a full pipe
+    output = proc.stdout.read().decode("utf-8", "replace")
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status) if hasattr(os, "waitstatus_to_exitcode") else status >> 8
+    wall = time.perf_counter() - started
+    peak = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return proc.returncode, wall, round(peak, 1), output[-2000:]
+
+
+def read_report(metrics_dir):
+    reports = sorted(glob.glob(os.path.join(metrics_dir, "*.json")), key=os.path.getmtime)
+    if not reports:
+        return None
+    with open(reports[-1], "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def throughput(name, report, wall):
+    """The scenario's headline rate: pages/s for builds, requests/s for scrapers"""
+    if not report or not wall or name == "http_cache":
+        return {}
+    counters = report.get("counters", {})
+    if name.startswith("build"):
+        pages = sum(v for k, v in counters.items() if k.endswith("pages_rendered"))
+        return {"pages_rendered": pages, "pages_per_s": round(pages / wall, 1)}
+    endpoints = report.get("requests", {}).get("endpoints", {})
+    requests = sum(e["requests"] for e in endpoints.values())
+    return {"requests": requests, "requests_per_s": round(requests / wall, 1),
+            "errors": sum(e["errors"] for e in endpoints.values()),
+            "retries": sum(e["retries"] for e in endpoints.values())}
+
+
+def change_one_match(work):
+    """Rename one of today's matches, as a typical scraper run between two builds would"""
+    path = os.path.join(work, "date", time.strftime("%Y%m%d") + ".json")
+    from fixture_files import load_fixtures, save_fixtures
+    matches = load_fixtures(path)
+    matches[0]["venue"] = matches[0]["venue"] + " (renamed)"
+    save_fixtures(path, matches)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Stub:
+    """stub_server.py as a child process for the scraper scenarios"""
+
+    def __init__(self, args):
+        self.port = free_port()
+        self.argv = [sys.executable, os.path.join(HERE, "stub_server.py"), "--port", str(self.port)]
+        for flag in ("matches_per_day", "countries", "channels", "countries_per_match", "channels_per_country",
+                     "latency", "jitter", "error_rate", "throttle_rate", "retry_after", "seed"):
+            self.argv += ["--" + flag.replace("_", "-"), str(getattr(args, flag))]
+        self.proc = None
+
+    def __enter__(self):
+        self.proc = subprocess.Popen(self.argv, stdout=subprocess.PIPE, text=True)
+        self.proc.stdout.readline()  # the "listening" line
+        return f"http://127.0.0.1:{self.port}/api/v1"
+
+    def __exit__(self, *exc):
+        self.proc.terminate()
+        self.proc.wait(timeout=10)
+
+
+def run_scenarios(args, names):
+    work = tempfile.mkdtemp(prefix="bench-")
+    results = {}
+    try:
+        for pattern in ("*.py", "*_template.html"):
+            for path in glob.glob(os.path.join(ROOT, pattern)):
+                shutil.copy2(path, work)
+        print(f"Generating data in {work} ...", flush=True)
+        started = time.perf_counter()
+        generate(work, **scale_of(args))
+        results["generate"] = {"wall_s": round(time.perf_counter() - started, 3)}
+
+        has_scraper_deps = importlib.util.find_spec("curl_cffi") is not None
+        needs_stub = "http_cache" in names or (has_scraper_deps and any(n in SCRAPER_SCENARIOS for n in names))
+        stub = Stub(args) if needs_stub else None
+        api = stub.__enter__() if stub else None
+        try:
+            for name in names:
+                if name in SCRAPER_SCENARIOS and not has_scraper_deps:
+                    print(f"{name}: skipped (curl_cffi is not installed)", flush=True)
+                    results[name] = {"skipped": "curl_cffi is not installed"}
+                    continue
+                results[name] = run_one(name, work, api, args.jobs)
+                r = results[name]
+                rate = r.get("pages_per_s", r.get("requests_per_s"))
+                print(f"{name}: exit {r['exit_code']}, {r['wall_s']:.2f}s, {r['peak_rss_mb']} MB peak"
+                      + (f", {rate}/s" if rate is not None else ""), flush=True)
+        finally:
+            if stub:
+                stub.__exit__(None, None, None)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    return results
+
+
+def run_one(name, work, api, jobs):
+    metrics_dir = os.path.join(work, "metrics", name)
+    env = dict(os.environ, METRICS_DIR=metrics_dir, PYTHONDONTWRITEBYTECODE="1")
+    env.pop("PROFILE_STAGE", None)
+    argv = [sys.executable]
+
+    if name.startswith("build"):
+        argv.append("build.py")
+        if name == "build_full":
+            pass
+        elif name == "build_incremental_noop":
+            argv.append("--incremental")
+        elif name == "build_incremental_change":
+            change_one_match(work)
+            argv.append("--incremental")
+        elif name == "build_parallel":
+            argv += ["--jobs", str(jobs)]
+        elif name == "build_stream":
+            argv.append("--stream")
+        if name in ("build_full", "build_parallel", "build_stream"):
+            # Every full build starts from the same empty state
+            for leftover in ("dist", "releases", ".build-manifest.json"):
+                path = os.path.join(work, leftover)
+                if os.path.islink(path) or os.path.isfile(path):
+                    os.unlink(path)
+                elif os.path.isdir(path):
+                    shutil.rmtree(path)
+    elif name == "http_cache":
+        argv += [os.path.join(HERE, "cache_check.py"), "--api", api]
+    else:
+        argv.append(f"{name}.py")
+        env["SOFASCORE_API"] = api
+        # Measure the network path, not a warm response cache from the previous scenario
+        cache = os.path.join(work, ".cache", "http.sqlite")
+        for path in (cache, cache + "-wal", cache + "-shm"):
+            if os.path.exists(path):
+                os.unlink(path)
+
+    code, wall, peak, tail = run_measured(argv, work, env)
+    report = read_report(metrics_dir)
+    result = {"argv": argv[1:], "exit_code": code, "wall_s": round(wall, 3), "peak_rss_mb": peak,
+              **throughput(name, report, wall)}
+    if report:
+        result["stages"] = {s["stage"]: s["wall_s"] for s in report.get("stages", [])}
+        result["counters"] = report.get("counters", {})
+        if name == "http_cache":
+            result["phases"] = report.get("phases", {})
+            result["failures"] = report.get("failures", [])
+    if code != 0:
+        result["output_tail"] = tail
+    return result
+
+
+def git_sha():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def machine():
+    return {"platform": platform.platform(), "python": platform.python_version(),
+            "processor": platform.processor() or platform.machine(), "cpus": os.cpu_count()}
+
+
+def compare(path_a, path_b):
+    with open(path_a, "r", encoding="utf-8") as f:
+        a = json.load(f)
+    with open(path_b, "r", encoding="utf-8") as f:
+        b = json.load(f)
+    print(f"A: {a.get('label')} @ {a.get('git_sha')}  B: {b.get('label')} @ {b.get('git_sha')}")
+    if a.get("scale") != b.get("scale"):
+        print("warning: the two runs used different scales")
+    print(f"{'scenario':26} {'wall A':>9} {'wall B':>9} {'B/A':>6} {'rss A':>8} {'rss B':>8} {'B/A':>6}")
+    for name in SCENARIOS:
+        ra, rb = a["results"].get(name), b["results"].get(name)
+        if not ra or not rb or "wall_s" not in ra or "wall_s" not in rb:
+            continue
+        print(f"{name:26} {ra['wall_s']:9.2f} {rb['wall_s']:9.2f} {rb['wall_s'] / ra['wall_s']:6.2f}"
+              f" {ra['peak_rss_mb']:8.1f} {rb['peak_rss_mb']:8.1f} {rb['peak_rss_mb'] / ra['peak_rss_mb']:6.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--only", nargs="+", choices=SCENARIOS, help="scenarios to run (default: all)")
+    parser.add_argument("--label", default="run", help="name for the results file")
+    parser.add_argument("--jobs", type=int, default=0, help="--jobs for build_parallel (0 = one per CPU)")
+    parser.add_argument("--compare", nargs=2, metavar=("A", "B"), help="compare two results files and exit")
+    add_scale_args(parser)
+    add_stub_args(parser)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        sys.exit(0)
+
+    # Scenarios run in this order; the incremental ones reuse the state build_full left behind
+    names = [n for n in SCENARIOS if not args.only or n in args.only]
+    results = run_scenarios(args, names)
+    stamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out = os.path.join(RESULTS_DIR, f"{stamp}-{args.label}.json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({"label": args.label, "started": stamp, "git_sha": git_sha(), "machine": machine(),
+                   "scale": scale_of(args), "results": results}, f, indent=1, sort_keys=True)
+    print(f"Results: {out}")
@@ -0,0 +1,167 @@
+"""Local stand-in for the SofaScore endpoints the scrapers use, with configurable latency and failures.
+
+    python bench/stub_server.py --port 8765 --latency 0.05 --error-rate 0.01 --throttle-rate 0.02
+    SOFASCORE_API=http://127.0.0.1:8765/api/v1 python ingest.py
+
+Responses come from synthetic.py, so they agree with what generate.py writes for the same scale.
+Every 200 carries an ETag (hash of the body) and a fixed Last-Modified, and a request whose
+If-None-Match or If-Modified-Since matches gets a bodyless 304, so http_cache.py's revalidation
+path runs against it too. GET /__stats returns request counts by route and status.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import signal
+from collections import Counter
+from datetime import date
+
+import synthetic
+
+ROUTES = [
+    ("schedule", re.compile(r"^/api/v1/sport/football/scheduled-events/(\d{4})-(\d{2})-(\d{2})(/inverse)?$")),
+    ("country-channels", re.compile(r"^/api/v1/tv/event/(\d+)/country-channels$")),
+    ("channel", re.compile(r"^/api/v1/tv/channel/(\d+)/schedule$")),
+    ("h2h", re.compile(r"^/api/v1/event/(\d+)/h2h$")),
+    ("lineups", re.compile(r"^/api/v1/event/(\d+)/lineups$")),
+    ("statistics", re.compile(r"^/api/v1/event/(\d+)/statistics$")),
+    ("odds", re.compile(r"^/api/v1/event/(\d+)/provider/1/winning-odds$")),
+    ("form", re.compile(r"^/api/v1/event/(\d+)/pregame-form$")),
+    ("event", re.compile(r"^/api/v1/event/(\d+)$")),
+]
+REASONS = {200: "OK", 304: "Not Modified", 404: "Not Found", 429: "Too Many Requests", 500: "Internal Server Error"}
+# Synthetic data never changes, so every response has been the same since the epoch of the data set
+LAST_MODIFIED = "Thu, 01 Jan 2026 00:00:00 GMT"
+
+
+def not_modified(headers, etag):
+    """Whether a request's conditional headers match a response with this ETag"""
+    if "if-none-match" in headers:
+        # If-None-Match wins over If-Modified-Since when both are sent (RFC 9110)
+        return etag in [t.strip() for t in headers["if-none-match"].split(",")]
+    return headers.get("if-modified-since") == LAST_MODIFIED
+
+
+class StubApi:
+    def __init__(self, args):
+        self.args = args
+        self.random = random.Random(args.seed)
+        self.stats = Counter()
+
+    def respond(self, path):
+        """(status, body, extra headers) for a request path"""
+        path = path.split("?", 1)[0]
+        if path == "/__stats":
+            return 200, {f"{route} {status}": n for (route, status), n in sorted(self.stats.items())}, {}
+        for route, pattern in ROUTES:
+            m = pattern.match(path)
+            if m:
+                break
+        else:
+            return 404, {"error": {"code": 404}}, {}
+
+        a = self.args
+        roll = self.random.random()
+        if roll < a.throttle_rate:
+            return 429, {"error": {"code": 429}}, {"Retry-After": str(a.retry_after)}
+        if roll < a.throttle_rate + a.error_rate:
+            return 500, {"error": {"code": 500}}, {}
+
+        if route == "schedule":
+            day = date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+            return 200, {"events": [synthetic.make_event(mid, kickoff)
+                                    for mid, kickoff in synthetic.day_matches(day, a.matches_per_day)]}, {}
+        mid = int(m.group(1))
+        if route == "country-channels":
+            return 200, {"countryChannels": synthetic.country_channels(
+                mid, a.countries, a.channels, a.countries_per_match, a.channels_per_country)}, {}
+        if route == "channel":
+            return 200, {"channel": {"id": mid, "name": synthetic.channel_name(mid)}, "events": []}, {}
+        if route == "event":
+            return 200, {"event": {"id": mid, "venue": {"name": synthetic.venue_name(mid)}}}, {}
+        return 200, synthetic.make_payload(route, mid), {}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length") or 0)
+                if length:
+                    await reader.readexactly(length)
+
+                parts = request_line.decode("latin-1").split()
+                path = parts[1] if len(parts) > 1 else "/"
+                status, body, extra = self.respond(path)
+                payload = json.dumps(body, separators=(",", ":")).encode("utf-8")
+                if status == 200 and path != "/__stats":
+                    etag = f'"{hashlib.sha1(payload).hexdigest()[:16]}"'
+                    extra = {**extra, "ETag": etag, "Last-Modified": LAST_MODIFIED}
+                    if not_modified(headers, etag):
+                        status, payload = 304, b""
+                route = next((r for r, p in ROUTES if p.match(path.split("?", 1)[0])), path)
+                self.stats[(route, status)] += 1
+
+                delay = self.args.latency + self.random.uniform(0, self.args.jitter)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+                        "Content-Type: application/json",
+                        f"Content-Length: {len(payload)}",
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                head += [f"{k}: {v}" for k, v in extra.items()]
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def add_stub_args(parser):
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.01, help="extra random latency, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+async def serve(args):
+    api = StubApi(args)
+    server = await asyncio.start_server(api.handle, args.host, args.port)
+    print(f"Stub SofaScore API on http://{args.host}:{args.port}/api/v1", flush=True)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    async with server:
+        await stop.wait()
+    print(json.dumps({f"{route} {status}": n for (route, status), n in sorted(api.stats.items())}), flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--matches-per-day", type=int, default=200)
+    parser.add_argument("--countries", type=int, default=40)
+    parser.add_argument("--channels", type=int, default=300)
+    parser.add_argument("--countries-per-match", type=int, default=8)
+    parser.add_argument("--channels-per-country", type=int, default=2)
+    add_stub_args(parser)
+    asyncio.run(serve(parser.parse_args()))
@@ -0,0 +1,125 @@
+"""Deterministic synthetic matches and SofaScore payloads, shared by generate.py and stub_server.py.
+
+Everything is derived from the match/channel id, so the generator and the stub server agree on
+what a given match looks like without sharing state.
+"""
+import random
+from datetime import datetime, timezone
+
+# (alpha-2 code, name) pairs; more countries than this get made-up codes
+COUNTRIES = [
+    ("GB", "United Kingdom"), ("US", "United States"), ("ES", "Spain"), ("DE", "Germany"), ("FR", "France"),
+    ("IT", "Italy"), ("PT", "Portugal"), ("NL", "Netherlands"), ("BE", "Belgium"), ("BR", "Brazil"),
+    ("AR", "Argentina"), ("MX", "Mexico"), ("CA", "Canada"), ("AU", "Australia"), ("IN", "India"),
+    ("NG", "Nigeria"), ("ZA", "South Africa"), ("EG", "Egypt"), ("MA", "Morocco"), ("DZ", "Algeria"),
+    ("SA", "Saudi Arabia"), ("AE", "United Arab Emirates"), ("QA", "Qatar"), ("TR", "Turkey"), ("GR", "Greece"),
+    ("PL", "Poland"), ("SE", "Sweden"), ("NO", "Norway"), ("DK", "Denmark"), ("FI", "Finland"),
+    ("IE", "Ireland"), ("CH", "Switzerland"), ("AT", "Austria"), ("CZ", "Czechia"), ("HU", "Hungary"),
+    ("RO", "Romania"), ("HR", "Croatia"), ("RS", "Serbia"), ("JP", "Japan"), ("KR", "South Korea"),
+]
+LEAGUES = [
+    (17, "Premier League"), (8, "LaLiga"), (35, "Bundesliga"), (23, "Serie A"), (34, "Ligue 1"),
+    (7, "UEFA Champions League"), (679, "UEFA Europa League"), (238, "Liga Portugal"), (37, "Eredivisie"),
+    (52, "Trendyol Süper Lig"), (955, "Saudi Pro League"), (242, "MLS"),
+]
+ENDPOINTS = ["h2h", "lineups", "statistics", "odds", "form"]
+
+
+def rng(*key):
+    # A str seed is hashed with SHA-512, so this is stable across runs and processes
+    return random.Random("/".join(str(k) for k in key))
+
+
+def country(n):
+    if n < len(COUNTRIES):
+        return COUNTRIES[n]
+    return f"Z{n:03d}", f"Synthetic Country {n}"
+
+
+def channel_name(channel_id):
+    return f"Sports Channel {channel_id}"
+
+
+def team_name(team_id):
+    return f"{rng('team', team_id).choice(['FC', 'United', 'City', 'Athletic', 'Sporting'])} {team_id}"
+
+
+def venue_name(match_id):
+    return f"Stadium {rng('venue', match_id).randrange(1, 2000)}"
+
+
+def day_matches(day, matches_per_day):
+    """[(match_id, kickoff)] scheduled on a date (a datetime.date), spread from 10:00 to 22:00 UTC"""
+    start = int(datetime(day.year, day.month, day.day, 10, tzinfo=timezone.utc).timestamp())
+    base = day.toordinal() * 100000
+    return [(base + i, start + (i * 12 * 3600 // max(matches_per_day, 1)) // 900 * 900)
+            for i in range(matches_per_day)]
+
+
+def make_event(match_id, kickoff):
+    """A scheduled-events entry; like the real feed, it often lacks the venue"""
+    r = rng("event", match_id)
+    league_id, league = r.choice(LEAGUES)
+    return {
+        "id": match_id,
+        "startTimestamp": kickoff,
+        "homeTeam": {"name": team_name(r.randrange(1, 5000))},
+        "awayTeam": {"name": team_name(r.randrange(1, 5000))},
+        "tournament": {"name": league, "uniqueTournament": {"id": league_id}},
+        "venue": {"name": venue_name(match_id)} if r.random() < 0.7 else None,
+    }
+
+
+def country_channels(match_id, countries, channels, countries_per_match, channels_per_country):
+    """{alpha-2 code: [channel ids]} for a match"""
+    r = rng("tv", match_id)
+    picked = r.sample(range(countries), min(countries_per_match, countries))
+    return {country(n)[0]: sorted(r.sample(range(1, channels + 1), min(channels_per_country, channels)))
+            for n in picked}
+
+
+def make_fixture(match_id, kickoff, countries, channels, countries_per_match, channels_per_country):
+    """A date/*.json record, as ingest.py builds it from the endpoints above"""
+    ev = make_event(match_id, kickoff)
+    names = dict(country(n) for n in range(countries))
+    tv = country_channels(match_id, countries, channels, countries_per_match, channels_per_country)
+    return {
+        "match_id": match_id,
+        "kickoff": kickoff,
+        "fixture": f"{ev['homeTeam']['name']} vs {ev['awayTeam']['name']}",
+        "league_id": ev["tournament"]["uniqueTournament"]["id"],
+        "league": ev["tournament"]["name"],
+        "venue": venue_name(match_id),
+        "tv_channels": sorted(
+            [{"country": names[code], "channels": sorted(channel_name(c) for c in ids)} for code, ids in tv.items()],
+            key=lambda c: c["country"]),
+    }
+
+
+def make_payload(endpoint, match_id):
+    """Response body of one per-event endpoint"""
+    r = rng(endpoint, match_id)
+    if endpoint == "h2h":
+        return {"teamDuel": {"homeWins": r.randrange(10), "awayWins": r.randrange(10), "draws": r.randrange(6)},
+                "managerDuel": None}
+    if endpoint == "form":
+        side = lambda: {"avgRating": f"{r.uniform(6, 7.5):.2f}", "position": r.randrange(1, 21),
+                        "value": str(r.randrange(5, 60)), "form": [r.choice("WDL") for _ in range(5)]}
+        return {"homeTeam": side(), "awayTeam": side(), "label": "Pts"}
+    if endpoint == "odds":
+        side = lambda: {"fractionalValue": f"{r.randrange(1, 20)}/{r.randrange(1, 10)}",
+                        "expected": r.randrange(10, 80), "actual": r.randrange(10, 80), "id": r.randrange(10 ** 8)}
+        return {"home": side(), "away": side()}
+    if endpoint == "lineups":
+        side = lambda: {"formation": r.choice(["4-3-3", "4-2-3-1", "3-5-2", "4-4-2"]), "players": [
+            {"player": {"name": f"Player {r.randrange(10 ** 5)}"}, "shirtNumber": n + 1, "jerseyNumber": str(n + 1),
+             "position": r.choice("GDMF"), "substitute": n >= 11, "avgRating": round(r.uniform(5.5, 8.5), 2)}
+            for n in range(20)]}
+        return {"confirmed": r.random() < 0.5, "home": side(), "away": side()}
+    if endpoint == "statistics":
+        items = [{"name": name, "home": str(r.randrange(0, 30)), "away": str(r.randrange(0, 30)),
+                  "homeValue": 0, "awayValue": 0, "key": name.lower().replace(" ", "")}
+                 for name in ["Ball possession", "Total shots", "Shots on target", "Corner kicks", "Fouls",
+                              "Passes", "Tackles", "Yellow cards"]]
+        return {"statistics": [{"period": "ALL", "groups": [{"groupName": "Match overview", "statisticsItems": items}]}]}
+    raise ValueError(f"unknown endpoint {endpoint}")
@@ -1,294 +1,980 @@
-import json, os, re, glob, time, tempfile, shutil 
+import argparse, hashlib, html, json, os, re, time, tempfile, shutil, zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone 
 
+from assets import add_payload, describe, encodings, minify_html, payload_totals, stylesheet_link, write_siblings, write_stylesheet
+from data_index import EndpointData, atomic_write
+from fixture_files import ArchivePacks
+from match_store import MatchStore
+from metrics import RunMetrics
+from releases import KEEP_RELEASES, ReleaseManager
+from search_index import SearchIndex
+from sitemap import SitemapWriter
+from template_engine import Markup, Template
+
 # --- CONFIGURATION ---
 DOMAIN = "https://tvlist.cricfoot.net"
 
 # Auto-detect system timezone offset
 LOCAL_OFFSET = timezone(timedelta(seconds=-time.timezone if time.daylight == 0 else -time.altzone))
 
+# The published site: a symlink to the current releases/<id>, see releases.py
 DIST_DIR = "dist"
-TEMP_DIR = "dist_temp"
+DATA_DIR = "data"
+# Copied into every release as dist/404.html
+NOT_FOUND_PAGE = "404.html"
 
-# Clean and create temp directory
-if os.path.exists(TEMP_DIR):
-    shutil.rmtree(TEMP_DIR)
-os.makedirs(TEMP_DIR, exist_ok=True)
+# Input/output hashes of the last build, used by --incremental
+MANIFEST_PATH = ".build-manifest.json"
+MANIFEST_VERSION = 4
 
-NOW = datetime.now(LOCAL_OFFSET)
-TODAY_DATE = NOW.date()
+# Files whose content feeds into every page (see BUILD_KEY)
+BUILD_SOURCES = [__file__, 'template_engine.py', 'assets.py']
 
-# CENTER LOGIC: To make Today the 4th item, we start the menu 3 days ago
-MENU_START_DATE = TODAY_DATE - timedelta(days=3)
-# We calculate the end date of the menu as well
-MENU_END_DATE = TODAY_DATE + timedelta(days=3)
+# Placeholders each template may use (and their NAME_JSON variants); anything else fails the build before a page is written
+TEMPLATE_FIELDS = {
+    'home': ['DOMAIN', 'STYLESHEET', 'PAGE_TITLE', 'SELECTED_DATE', 'CURRENT_PATH', 'WEEKLY_MENU', 'MATCH_LISTING'],
+    'match': ['DOMAIN', 'STYLESHEET', 'FIXTURE', 'LEAGUE', 'DATE', 'TIME', 'START', 'LOCAL_DATE', 'LOCAL_TIME', 'UNIX', 'VENUE', 'BROADCAST_ROWS', 'MATCH_DATA'],
+    'channel': ['DOMAIN', 'STYLESHEET', 'CHANNEL_NAME', 'WEEKLY_MENU', 'MATCH_LISTING'],
+}
 
 TOP_LEAGUE_IDS = [17, 35, 23, 7, 8, 34, 679]
 
 # Google Ads Code Block
 ADS_CODE = '''
-<div class="ad-container" style="margin: 20px 0; text-align: center;">
+<div class="ad-container">
  
 </div>
 '''
 
-MENU_CSS = '''
-<style>
-    .weekly-menu-container {
-        display: flex;
-        width: 100%;
-        gap: 4px;
-        padding: 10px 5px;
-        box-sizing: border-box;
-        justify-content: space-between;
-    }
-    .date-btn {
-        flex: 1;
-        display: flex;
-        flex-direction: column;
-        align-items: center;
-        justify-content: center;
-        padding: 8px 2px;
-        text-decoration: none;
-        border-radius: 6px;
-        background: #fff;
-        border: 1px solid #e2e8f0;
-        min-width: 0; 
-        transition: all 0.2s;
-    }
-    .date-btn div { font-size: 9px; text-transform: uppercase; color: #64748b; font-weight: bold; }
-    .date-btn b { font-size: 10px; color: #1e293b; white-space: nowrap; }
-    .date-btn.active { background: #2563eb; border-color: #2563eb; }
-    .date-btn.active div, .date-btn.active b { color: #fff; }
-    
-    @media (max-width: 480px) {
-        .date-btn b { font-size: 8px; }
-        .date-btn div { font-size: 7px; }
-        .weekly-menu-container { gap: 2px; padding: 5px 2px; }
-    }
-</style>
-'''
-
 def slugify(t): 
     return re.sub(r'[^a-z0-9]+', '-', str(t).lower()).strip('-')
 
-def atomic_write(path, content):
-    """Write file atomically to prevent serving partial content"""
-    directory = os.path.dirname(path)
-    if directory:
-        os.makedirs(directory, exist_ok=True)
-    
-    # Write to temp file first
-    temp_fd, temp_path = tempfile.mkstemp(dir=directory, text=True)
-    try:
-        with os.fdopen(temp_fd, 'w', encoding='utf-8') as f:
-            f.write(content)
-        # Atomic rename
-        os.replace(temp_path, path)
-    except:
-        if os.path.exists(temp_path):
-            os.unlink(temp_path)
-        raise
-
-# --- 1. LOAD TEMPLATES ---
+def content_hash(value):
+    """Stable hash of a str/bytes or any JSON-serialisable value"""
+    if not isinstance(value, (str, bytes)):
+        value = json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+    return hashlib.sha1(value).hexdigest()
+
+# --- BUILD CONTEXT ---
+# Everything below depends on the build clock. init_build() sets it up once in the main
+# process and again in every worker from the same timestamp, so all processes agree.
+NOW = TODAY_DATE = MENU_START_DATE = MENU_END_DATE = None
+BUILD_KEY = None
 templates = {}
-for name in ['home', 'match', 'channel']:
+weekly_menu = channel_menu = stylesheet = None
+endpoint_data = None
+# Sibling suffixes (.gz, .br) written next to every page, see --precompress
+PRECOMPRESS = []
+# The unpublished release directory this build writes into
+OUT_DIR = None
+
+def init_build(now, precompress=(), out_dir=None):
+    global NOW, TODAY_DATE, MENU_START_DATE, MENU_END_DATE, BUILD_KEY, weekly_menu, channel_menu, stylesheet, endpoint_data, PRECOMPRESS, OUT_DIR
+
+    NOW = now
+    TODAY_DATE = NOW.date()
+    PRECOMPRESS = list(precompress)
+    OUT_DIR = out_dir
+
+    # CENTER LOGIC: To make Today the 4th item, we start the menu 3 days ago
+    MENU_START_DATE = TODAY_DATE - timedelta(days=3)
+    # We calculate the end date of the menu as well
+    MENU_END_DATE = TODAY_DATE + timedelta(days=3)
+
+    # --- 1. LOAD TEMPLATES ---
+    for name, fields in TEMPLATE_FIELDS.items():
+        try:
+            templates[name] = Template.from_file(f'{name}_template.html', allowed=fields)
+        except FileNotFoundError:
+            print(f"CRITICAL ERROR: {name}_template.html not found.")
+
+    # Anything that changes every page: the build code itself, templates and site-wide settings
+    build_sources = []
+    for path in BUILD_SOURCES:
+        with open(path, 'r', encoding='utf-8') as f:
+            build_sources.append(f.read())
+    BUILD_KEY = content_hash([build_sources, {n: t.source for n, t in templates.items()}, DOMAIN, str(LOCAL_OFFSET)])
+
+    # The 7-day menu is centred on today, so it is the same on every page
+    day_links = ['<div class="weekly-menu-container">']
+    channel_links = ['<div class="weekly-menu-container">']
+    for j in range(7):
+        m_day = MENU_START_DATE + timedelta(days=j)
+        m_fname = "index.html" if m_day == TODAY_DATE else f"{m_day.strftime('%Y-%m-%d')}.html"
+        active_class = "active" if m_day == TODAY_DATE else ""
+        day_links.append(f'''
+        <a href="{DOMAIN}/{m_fname}" class="date-btn {active_class}">
+            <div>{m_day.strftime("%a")}</div>
+            <b>{m_day.strftime("%b %d")}</b>
+        </a>''')
+        channel_links.append(f'<a href="{DOMAIN}/{m_fname}" class="date-btn {active_class}"><div>{m_day.strftime("%a")}</div><b>{m_day.strftime("%b %d")}</b></a>')
+    weekly_menu = Markup("".join(day_links) + '</div>')
+    channel_menu = Markup("".join(channel_links) + '</div>')
+    stylesheet = Markup(stylesheet_link(DOMAIN))
+
+    # Opened per process, files are only mapped once a page asks for them
+    endpoint_data = EndpointData(DATA_DIR)
+
+# --- MANIFEST (--incremental) ---
+def empty_manifest():
+    return {'version': MANIFEST_VERSION, 'matches': {}, 'pages': {}, 'history': {}}
+
+def load_manifest():
+    """Manifest of the build currently in dist/, or an empty one if missing/outdated"""
     try:
-        with open(f'{name}_template.html', 'r', encoding='utf-8') as f:
-            templates[name] = f.read()
-    except FileNotFoundError:
-        print(f"CRITICAL ERROR: {name}_template.html not found.")
+        with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') == MANIFEST_VERSION:
+            return data
+    except (OSError, ValueError):
+        pass
+    return empty_manifest()
+
+def page_signature(context, deps, match_hashes):
+    """Hash of everything a page is rendered from: its own context plus the input hash of every match it lists"""
+    return content_hash([context, [[mid, match_hashes[str(mid)]] for mid in deps]])
+
+def reuse_page(rel_path, signature, prev_pages):
+    """Link an unchanged page from the previous dist/ into the new tree.
+
+    Returns its manifest record, or None if the page has to be re-rendered.
+    """
+    prev = prev_pages.get(rel_path)
+    if not prev or prev['inputs'] != signature:
+        return None
+    src = os.path.join(DIST_DIR, rel_path)
+    try:
+        if os.path.getsize(src) != prev['size']:
+            return None
+    except OSError:
+        return None
+
+    # A page is only reusable with the precompressed siblings this build wants
+    suffixes = [""] + PRECOMPRESS
+    if not all(os.path.exists(src + suffix) for suffix in PRECOMPRESS):
+        return None
+
+    dst = os.path.join(OUT_DIR, rel_path)
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    for suffix in suffixes:
+        try:
+            # Sharing the inode is safe: a release is never written to again once it is published
+            os.link(src + suffix, dst + suffix)
+        except OSError:
+            shutil.copy2(src + suffix, dst + suffix)
+    return prev
+
+def write_page(rel_path, signature, deps, content):
+    """Minify and write a freshly rendered page (plus its precompressed siblings) and return its manifest record"""
+    raw_size = len(content.encode('utf-8'))
+    if rel_path.endswith('.html'):
+        content = minify_html(content)
+    data = content.encode('utf-8')
+    path = os.path.join(OUT_DIR, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Nothing serves the release directory until it is published: no temp file and rename per page
+    with open(path, 'wb') as f:
+        f.write(data)
+    record = {'inputs': signature, 'output': content_hash(data), 'size': len(data), 'raw': raw_size, 'deps': deps}
+    if PRECOMPRESS:
+        record['encoded'] = write_siblings(path, data, PRECOMPRESS)
+    return record
+
+def stamp_changed(record, prev):
+    """Keep the time the page's output last changed from its previous record, or stamp it with this build"""
+    if prev and prev.get('output') == record['output'] and prev.get('changed'):
+        record['changed'] = prev['changed']
+    else:
+        record['changed'] = NOW.isoformat(timespec='seconds')
+    return record
 
 # --- 2. LOAD DATA ---
-all_matches = []
-seen_match_ids = set()
-for f in glob.glob("date/*.json"):
-    with open(f, 'r', encoding='utf-8') as j:
+def load_matches():
+    """All listed matches from the match store, plus the fixture-file days each match is listed under (where its data/ files live)"""
+    store = MatchStore()
+    # date/ files committed since the store last saw them (or all of them, on a fresh checkout)
+    imported = store.sync_files(payloads=False)
+    if imported:
+        print(f"Match store: imported {imported} changed fixture files")
+    all_matches, listed_days = store.matches(), store.listed_days()
+    store.close()
+    return all_matches, listed_days
+
+def build_match_index(matches, listed_days):
+    """Normalise every match once (local datetime, slug, URL, date folder) and bucket it by day and channel"""
+    index = {'entries': [], 'by_day': {}, 'by_channel': {}}
+    channel_cutoff = NOW.timestamp() - 86400
+    for m in matches:
+        dt = datetime.fromtimestamp(int(m['kickoff']), tz=timezone.utc).astimezone(LOCAL_OFFSET)
+        slug = slugify(m['fixture'])
+        date_folder = dt.strftime('%Y%m%d')
+        entry = {
+            'm': m,
+            'dt': dt,
+            'slug': slug,
+            'date_folder': date_folder,
+            'url': f"{DOMAIN}/match/{slug}/{date_folder}/",
+            'league': m.get('league', 'Other Football'),
+            'data_days': sorted(listed_days.get(m['match_id'], [])),
+        }
+        index['entries'].append(entry)
+        index['by_day'].setdefault(dt.date(), []).append(entry)
+
+        # Every channel gets a page; only matches from the last 24h onwards are listed on it
+        for c in m.get('tv_channels', []):
+            for ch in c['channels']:
+                listed = index['by_channel'].setdefault(ch, {})
+                if int(m['kickoff']) > channel_cutoff:
+                    listed.setdefault(m['match_id'], entry)
+    return index
+
+# --- MATCH DATA SECTIONS (data/ endpoints) ---
+def data_section(title, rows):
+    return f'''
+        <div class="section-header">{title}</div>
+        <div class="bg-white shadow-xl rounded-b-lg overflow-hidden border border-slate-200 mb-8">{"".join(rows)}
+        </div>'''
+
+def compare_row(home, label, away):
+    """One home | label | away line, values escaped"""
+    return f'''
+            <div class="cmp-row">
+                <div class="cmp-home">{html.escape(str(home))}</div>
+                <div class="cmp-label">{html.escape(str(label))}</div>
+                <div class="cmp-away">{html.escape(str(away))}</div>
+            </div>'''
+
+def render_match_data(e):
+    """Lineups, statistics, odds, form and h2h for a match page, read lazily from data/"""
+    mid, days = e['m']['match_id'], e['data_days']
+    home, _, away = e['m']['fixture'].partition(" vs ")
+    away = away or "Away"
+    sections = []
+
+    form = endpoint_data.get('form', days, mid)
+    if form and form.get('homeTeam') and form.get('awayTeam'):
+        h, a = form['homeTeam'], form['awayTeam']
+        rows = [compare_row(home, "", away),
+                compare_row(" ".join(h.get('form') or []), "Last 5", " ".join(a.get('form') or []))]
+        if h.get('position') or a.get('position'):
+            rows.append(compare_row(h.get('position', '-'), "Position", a.get('position', '-')))
+        if h.get('value') or a.get('value'):
+            rows.append(compare_row(h.get('value', '-'), form.get('label') or "Points", a.get('value', '-')))
+        if h.get('avgRating') or a.get('avgRating'):
+            rows.append(compare_row(h.get('avgRating', '-'), "Avg. rating", a.get('avgRating', '-')))
+        sections.append(data_section("Team Form", rows))
+
+    h2h = endpoint_data.get('h2h', days, mid)
+    duel = (h2h or {}).get('teamDuel')
+    if duel:
+        sections.append(data_section("Head to Head", [
+            compare_row(home, "", away),
+            compare_row(duel.get('homeWins', 0), f"Draws: {duel.get('draws', 0)}", duel.get('awayWins', 0)),
+        ]))
+
+    odds = endpoint_data.get('odds', days, mid)
+    if odds and (odds.get('home') or odds.get('away')):
+        def chance(side):
+            return f"{side['expected']}% ({side.get('fractionalValue', '-')})" if side and 'expected' in side else "-"
+        sections.append(data_section("Win Probability", [
+            compare_row(home, "", away),
+            compare_row(chance(odds.get('home')), "Expected", chance(odds.get('away'))),
+        ]))
+
+    lineups = endpoint_data.get('lineups', days, mid)
+    if lineups and lineups.get('home') and lineups.get('away'):
+        def starters(side):
+            return [f"{p.get('shirtNumber', p.get('jerseyNumber', ''))} {p['player'].get('name', '')}".strip()
+                    for p in side.get('players', []) if not p.get('substitute') and p.get('player')]
+        hs, aws = starters(lineups['home']), starters(lineups['away'])
+        rows = [compare_row(home, lineups['home'].get('formation', ''), away)]
+        rows += [compare_row(hp, "", ap) for hp, ap in zip(hs + [""] * (len(aws) - len(hs)), aws + [""] * (len(hs) - len(aws)))]
+        sections.append(data_section("Confirmed Lineups" if lineups.get('confirmed') else "Predicted Lineups", rows))
+
+    stats = endpoint_data.get('statistics', days, mid)
+    periods = [p for p in (stats or {}).get('statistics', []) if p.get('period') == 'ALL']
+    if periods:
+        rows = [compare_row(home, "", away)]
+        for group in periods[0].get('groups', []):
+            for item in group.get('statisticsItems', []):
+                rows.append(compare_row(item.get('home', '-'), item.get('name', ''), item.get('away', '-')))
+        sections.append(data_section("Match Statistics", rows))
+
+    return "".join(sections)
+
+# --- ARCHIVE (days packed out of date/) ---
+# Only the active window of date/ files is loaded on every build. Pages that depend on archived
+# days ("history": their match pages, day pages up to the first active day, channels seen only
+# there) are carried over from the previous build until the day rolls over, the build key
+# changes or a pack changes; then the packs are read and those pages planned like any other.
+def load_archive(packs, active_ids):
+    """Archived matches that no date/ file lists any more, plus the pack days each is listed under"""
+    matches, listed_days = {}, {}
+    for day in packs.days():
+        for m in packs.load_day(day):
+            mid = m.get('match_id')
+            if not mid or not m.get('kickoff') or mid in active_ids:
+                continue
+            listed_days.setdefault(mid, []).append(day)
+            # Later days win, like re-imported date/ files in the store
+            matches[mid] = m
+    return list(matches.values()), listed_days
+
+def history_state(packs, boundary, active_matches, active_channels):
+    """Hash of everything the history pages are built from"""
+    cutoff = None
+    if boundary:
+        cutoff = datetime.combine(boundary + timedelta(days=1), datetime.min.time(), tzinfo=LOCAL_OFFSET).timestamp()
+    # Active matches can still fall on the boundary days, whose day pages are history
+    on_boundary = sorted(content_hash(m) for m in active_matches if cutoff is None or int(m['kickoff']) < cutoff)
+    return content_hash([BUILD_KEY, TODAY_DATE.isoformat(), packs.digest(), str(boundary),
+                         on_boundary, sorted(active_channels)])
+
+def is_history(job, active_ids, active_channels, boundary):
+    kind, args = job[0], job[4]
+    if kind == 'match':
+        return args[0]['m']['match_id'] not in active_ids
+    if kind in ('day', 'day_api'):
+        return boundary is None or args[0] <= boundary
+    return args[0] not in active_channels
+
+def history_intact(paths, prev_pages):
+    """True if every page from the last history build is still in dist/ as recorded"""
+    for rel_path in paths:
+        prev = prev_pages.get(rel_path)
         try:
-            data = json.load(j)
-            for m in data:
-                mid = m.get('match_id')
-                if mid and mid not in seen_match_ids:
-                    all_matches.append(m)
-                    seen_match_ids.add(mid)
-        except Exception as e:
-            print(f"Warning: Failed to load {f}: {e}")
-            continue
-
-channels_data = {}
-sitemap_urls = [DOMAIN + "/"]
-
-# --- 3. PRE-PROCESS ALL MATCHES (FOR MATCH PAGES & SITEMAP) ---
-print("Building match pages...")
-for m in all_matches:
-    m_dt_local = datetime.fromtimestamp(int(m['kickoff']), tz=timezone.utc).astimezone(LOCAL_OFFSET)
-    m_slug = slugify(m['fixture'])
-    m_date_folder = m_dt_local.strftime('%Y%m%d')
-    m_url = f"{DOMAIN}/match/{m_slug}/{m_date_folder}/"
-    sitemap_urls.append(m_url)
-    
-    league = m.get('league', 'Other Football')
-    
-    # --- CHANNEL DATA POPULATION ---
-    for c in m.get('tv_channels', []):
-        for ch in c['channels']:
-            if ch not in channels_data: channels_data[ch] = []
-            if int(m['kickoff']) > (NOW.timestamp() - 86400):
-                if not any(x['m']['match_id'] == m['match_id'] for x in channels_data[ch]):
-                    channels_data[ch].append({'m': m, 'dt': m_dt_local, 'league': league})
-
-    # --- GENERATE INDIVIDUAL MATCH PAGE ---
-    m_path = f"{TEMP_DIR}/match/{m_slug}/{m_date_folder}/index.html"
+            if not prev or os.path.getsize(os.path.join(DIST_DIR, rel_path)) != prev['size']:
+                return False
+        except OSError:
+            return False
+        if not all(os.path.exists(os.path.join(DIST_DIR, rel_path + suffix)) for suffix in PRECOMPRESS):
+            return False
+    return True
+
+def page_url(rel_path):
+    return f"{DOMAIN}/{rel_path[:-len('index.html')] if rel_path.endswith('index.html') else rel_path}"
+
+# --- 3. INDIVIDUAL MATCH PAGES ---
+def render_match_page(e):
+    m, m_dt_local, league = e['m'], e['dt'], e['league']
     venue_val = m.get('venue') or m.get('stadium') or "To Be Announced"
     
-    rows = ""
+    rows = []
     country_counter = 0
     for c in m.get('tv_channels', []):
         country_counter += 1
-        channel_links = [f'<a href="{DOMAIN}/channel/{slugify(ch)}/" style="display: inline-block; background: #f1f5f9; color: #2563eb; padding: 2px 8px; border-radius: 4px; margin: 2px; text-decoration: none; font-weight: 600; border: 1px solid #e2e8f0;">{ch}</a>' for ch in c['channels']]
+        channel_links = [f'<a href="{DOMAIN}/channel/{slugify(ch)}/" class="ch-pill">{html.escape(ch)}</a>' for ch in c['channels']]
         pills = "".join(channel_links)
         
-        rows += f'''
-        <div style="display: flex; align-items: flex-start; padding: 12px; border-bottom: 1px solid #edf2f7; background: #fff;">
-            <div style="flex: 0 0 100px; font-weight: 800; color: #475569; font-size: 13px; padding-top: 4px;">{c["country"]}</div>
-            <div style="flex: 1; display: flex; flex-wrap: wrap; gap: 4px;">{pills}</div>
-        </div>'''
+        rows.append(f'''
+        <div class="bc-row">
+            <div class="bc-country">{html.escape(c["country"])}</div>
+            <div class="bc-channels">{pills}</div>
+        </div>''')
         if country_counter % 10 == 0:
-            rows += ADS_CODE
+            rows.append(ADS_CODE)
 
-    m_html = templates['match'].replace("{{FIXTURE}}", m['fixture']).replace("{{DOMAIN}}", DOMAIN)
-    m_html = m_html.replace("{{BROADCAST_ROWS}}", rows).replace("{{LEAGUE}}", league)
-    m_html = m_html.replace("{{LOCAL_DATE}}", f'<span class="auto-date" data-unix="{m["kickoff"]}">{m_dt_local.strftime("%d %b %Y")}</span>')
-    m_html = m_html.replace("{{LOCAL_TIME}}", f'<span class="auto-time" data-unix="{m["kickoff"]}">{m_dt_local.strftime("%H:%M")}</span>')
-    m_html = m_html.replace("{{UNIX}}", str(m['kickoff'])).replace("{{VENUE}}", venue_val)
-    
-    atomic_write(m_path, m_html)
-
-# --- 4. GENERATE DAILY LISTING PAGES (ALL DATES, MENU STILL 7 DAYS) ---
-print("Building daily pages...")
-ALL_DATES = sorted({
-    datetime.fromtimestamp(int(m['kickoff']), tz=timezone.utc)
-    .astimezone(LOCAL_OFFSET).date()
-    for m in all_matches
-})
+    return templates['match'].render({
+        'DOMAIN': DOMAIN,
+        'STYLESHEET': stylesheet,
+        'FIXTURE': m['fixture'],
+        'LEAGUE': league,
+        'DATE': m_dt_local.strftime("%Y-%m-%d"),
+        'TIME': m_dt_local.strftime("%H:%M"),
+        # JSON-LD startDate: ISO 8601 with the UTC offset
+        'START': m_dt_local.isoformat(timespec='seconds'),
+        'LOCAL_DATE': Markup(f'<span class="auto-date" data-unix="{m["kickoff"]}">{m_dt_local.strftime("%d %b %Y")}</span>'),
+        'LOCAL_TIME': Markup(f'<span class="auto-time" data-unix="{m["kickoff"]}">{m_dt_local.strftime("%H:%M")}</span>'),
+        'UNIX': m['kickoff'],
+        'VENUE': venue_val,
+        'BROADCAST_ROWS': Markup("".join(rows)),
+        'MATCH_DATA': Markup(render_match_data(e)),
+    })
 
-for day in ALL_DATES:
-    fname = "index.html" if day == TODAY_DATE else f"{day.strftime('%Y-%m-%d')}.html"
-    out_path = f"{TEMP_DIR}/{fname}"
-    
-    if fname != "index.html": sitemap_urls.append(f"{DOMAIN}/{fname}")
-
-    page_specific_menu = f'{MENU_CSS}<div class="weekly-menu-container">'
-    for j in range(7):
-        m_day = MENU_START_DATE + timedelta(days=j)
-        m_fname = "index.html" if m_day == TODAY_DATE else f"{m_day.strftime('%Y-%m-%d')}.html"
-        active_class = "active" if m_day == TODAY_DATE else ""
-        page_specific_menu += f'''
-        <a href="{DOMAIN}/{m_fname}" class="date-btn {active_class}">
-            <div>{m_day.strftime("%a")}</div>
-            <b>{m_day.strftime("%b %d")}</b>
-        </a>'''
-    page_specific_menu += '</div>'
-
-    day_matches = []
-    for m in all_matches:
-        m_dt_local = datetime.fromtimestamp(int(m['kickoff']), tz=timezone.utc).astimezone(LOCAL_OFFSET)
-        if m_dt_local.date() == day:
-            day_matches.append(m)
-
-    day_matches.sort(key=lambda x: (
-        x.get('league_id') not in TOP_LEAGUE_IDS, 
-        x.get('league', 'Other Football'), 
-        x['kickoff']
-    ))
-
-    listing_html, last_league = "", ""
+# --- 4. DAILY LISTING PAGES (ALL DATES, MENU STILL 7 DAYS) ---
+def render_day_page(day, fname, day_entries):
+    listing, last_league = [], ""
     league_counter = 0
 
-    for m in day_matches:
-        league = m.get('league', 'Other Football')
+    for e in day_entries:
+        m, m_dt_local, league = e['m'], e['dt'], e['league']
         if league != last_league:
             if last_league != "":
                 league_counter += 1
                 if league_counter % 3 == 0:
-                    listing_html += ADS_CODE
-            listing_html += f'<div class="league-header">{league}</div>'
+                    listing.append(ADS_CODE)
+            listing.append(f'<div class="league-header">{html.escape(league)}</div>')
             last_league = league
         
-        m_dt_local = datetime.fromtimestamp(int(m['kickoff']), tz=timezone.utc).astimezone(LOCAL_OFFSET)
-        m_slug = slugify(m['fixture'])
-        m_date_folder = m_dt_local.strftime('%Y%m%d')
-        m_url = f"{DOMAIN}/match/{m_slug}/{m_date_folder}/"
-        
-        listing_html += f'''
-        <a href="{m_url}" class="match-row flex items-center p-4 bg-white group border-b border-slate-100">
-            <div class="time-box" style="min-width: 95px; text-align: center; border-right: 1px solid #edf2f7; margin-right: 10px;">
+        listing.append(f'''
+        <a href="{e['url']}" class="match-row flex items-center p-4 bg-white group border-b border-slate-100">
+            <div class="time-box">
                 <div class="text-[10px] uppercase text-slate-400 font-bold auto-date" data-unix="{m['kickoff']}">{m_dt_local.strftime('%d %b')}</div>
                 <div class="font-bold text-blue-600 text-sm auto-time" data-unix="{m['kickoff']}">{m_dt_local.strftime('%H:%M')}</div>
             </div>
             <div class="flex-1">
-                <span class="text-slate-800 font-semibold text-sm md:text-base">{m['fixture']}</span>
+                <span class="text-slate-800 font-semibold text-sm md:text-base">{html.escape(m['fixture'])}</span>
             </div>
-        </a>'''
+        </a>''')
 
-    if listing_html != "": listing_html += ADS_CODE
+    if listing: listing.append(ADS_CODE)
 
-    output = templates['home'].replace("{{MATCH_LISTING}}", listing_html).replace("{{WEEKLY_MENU}}", page_specific_menu)
-    output = output.replace("{{DOMAIN}}", DOMAIN).replace("{{SELECTED_DATE}}", day.strftime("%A, %b %d, %Y"))
-    output = output.replace("{{PAGE_TITLE}}", f"TV Channels For {day.strftime('%A, %b %d, %Y')}")
-    
-    atomic_write(out_path, output)
+    return templates['home'].render({
+        'DOMAIN': DOMAIN,
+        'STYLESHEET': stylesheet,
+        'PAGE_TITLE': f"TV Channels For {day.strftime('%A, %b %d, %Y')}",
+        'SELECTED_DATE': day.strftime("%A, %b %d, %Y"),
+        'CURRENT_PATH': "/" if fname == "index.html" else f"/{fname}",
+        'WEEKLY_MENU': weekly_menu,
+        'MATCH_LISTING': Markup("".join(listing)),
+    })
 
 # --- 5. CHANNEL PAGES ---
-print("Building channel pages...")
-for ch_name, matches in channels_data.items():
-    c_slug = slugify(ch_name)
-    c_path = f"{TEMP_DIR}/channel/{c_slug}/index.html"
-    sitemap_urls.append(f"{DOMAIN}/channel/{c_slug}/")
-    
-    channel_menu = f'{MENU_CSS}<div class="weekly-menu-container">'
-    for j in range(7):
-        m_day = MENU_START_DATE + timedelta(days=j)
-        m_fname = "index.html" if m_day == TODAY_DATE else f"{m_day.strftime('%Y-%m-%d')}.html"
-        active_class = "active" if m_day == TODAY_DATE else ""
-        channel_menu += f'<a href="{DOMAIN}/{m_fname}" class="date-btn {active_class}"><div>{m_day.strftime("%a")}</div><b>{m_day.strftime("%b %d")}</b></a>'
-    channel_menu += '</div>'
- 
-    c_listing = ""
-    matches.sort(key=lambda x: x['m']['kickoff'])
-    for item in matches:
-        m, dt, m_league = item['m'], item['dt'], item['league']
-        c_listing += f'''
-        <a href="{DOMAIN}/match/{slugify(m['fixture'])}/{dt.strftime('%Y%m%d')}/" class="match-row flex items-center p-4 bg-white border-b border-slate-100 group">
-            <div class="time-box" style="min-width: 95px; text-align: center; border-right: 1px solid #edf2f7; margin-right: 10px;">
+def render_channel_page(ch_name, c_entries):
+    c_listing = []
+    for e in c_entries:
+        m, dt, m_league = e['m'], e['dt'], e['league']
+        c_listing.append(f'''
+        <a href="{e['url']}" class="match-row flex items-center p-4 bg-white border-b border-slate-100 group">
+            <div class="time-box">
                 <div class="text-[10px] uppercase text-slate-400 font-bold auto-date" data-unix="{m['kickoff']}">{dt.strftime('%d %b')}</div>
                 <div class="font-bold text-blue-600 text-sm auto-time" data-unix="{m['kickoff']}">{dt.strftime('%H:%M')}</div>
             </div>
             <div class="flex-1">
-                <span class="text-slate-800 font-semibold text-sm md:text-base">{m['fixture']}</span>
-                <div class="text-[11px] text-blue-500 font-medium uppercase mt-0.5">{m_league}</div>
+                <span class="text-slate-800 font-semibold text-sm md:text-base">{html.escape(m['fixture'])}</span>
+                <div class="text-[11px] text-blue-500 font-medium uppercase mt-0.5">{html.escape(m_league)}</div>
             </div>
-        </a>'''
+        </a>''')
     
-    c_html = templates['channel'].replace("{{CHANNEL_NAME}}", ch_name).replace("{{MATCH_LISTING}}", c_listing).replace("{{DOMAIN}}", DOMAIN).replace("{{WEEKLY_MENU}}", channel_menu)
-    atomic_write(c_path, c_html)
-
-# --- 6. SITEMAP ---
-print("Building sitemap...")
-sitemap_content = '<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
-for url in sorted(list(set(sitemap_urls))):
-    sitemap_content += f'<url><loc>{url}</loc><lastmod>{NOW.strftime("%Y-%m-%d")}</lastmod></url>'
-sitemap_content += '</urlset>'
-atomic_write(f"{TEMP_DIR}/sitemap.xml", sitemap_content)
-
-# --- 7. ATOMIC SWAP: Replace dist/ with new content ---
-print("Swapping directories atomically...")
-if os.path.exists(DIST_DIR):
-    backup_dir = f"{DIST_DIR}_old_{int(time.time())}"
-    os.rename(DIST_DIR, backup_dir)
-    os.rename(TEMP_DIR, DIST_DIR)
-    shutil.rmtree(backup_dir)
-else:
-    os.rename(TEMP_DIR, DIST_DIR)
-
-print("✅ Build complete → dist/ (zero downtime)")
+    return templates['channel'].render({
+        'DOMAIN': DOMAIN,
+        'STYLESHEET': stylesheet,
+        'CHANNEL_NAME': ch_name,
+        'WEEKLY_MENU': channel_menu,
+        'MATCH_LISTING': Markup("".join(c_listing)),
+    })
+
+# --- 6. JSON SHARDS (dist/api/) ---
+# Compact listings for lazy loading, one per day and channel page, built from the same entries
+API_FIELDS = ["id", "kickoff", "fixture", "league", "path"]
+
+def api_rows(entries):
+    return [[e['m']['match_id'], int(e['m']['kickoff']), e['m']['fixture'], e['league'], e['url'][len(DOMAIN):]]
+            for e in entries]
+
+def render_day_api(day, day_entries):
+    return json.dumps({'date': day.isoformat(), 'fields': API_FIELDS, 'matches': api_rows(day_entries)},
+                      ensure_ascii=False, separators=(',', ':'))
+
+def render_channel_api(ch_name, c_entries):
+    return json.dumps({'channel': ch_name, 'fields': API_FIELDS, 'matches': api_rows(c_entries)},
+                      ensure_ascii=False, separators=(',', ':'))
+
+def fill_search(search, entries, active_ids):
+    """Add the active matches among entries to the search index; archived ones are left out"""
+    for e in entries:
+        m = e['m']
+        if m['match_id'] in active_ids:
+            search.add_match(m['match_id'], m['kickoff'], m['fixture'], e['league'], e['url'][len(DOMAIN):])
+
+RENDERERS = {
+    'match': render_match_page,
+    'day': render_day_page,
+    'channel': render_channel_page,
+    'day_api': render_day_api,
+    'channel_api': render_channel_api,
+}
+
+def plan_match(e, match_hashes):
+    deps = [e['m']['match_id']]
+    rel_path = f"match/{e['slug']}/{e['date_folder']}/index.html"
+    # Live data (lineups, statistics...) only feeds the match page, not the listings
+    context = [BUILD_KEY, endpoint_data.digest(e['data_days'], e['m']['match_id'])]
+    return ('match', rel_path, page_signature(context, deps, match_hashes), deps, (e,))
+
+def plan_day(day, entries, match_hashes):
+    fname = "index.html" if day == TODAY_DATE else f"{day.strftime('%Y-%m-%d')}.html"
+    day_entries = sorted(entries, key=lambda e: (
+        e['m'].get('league_id') not in TOP_LEAGUE_IDS, 
+        e['league'], 
+        e['m']['kickoff']
+    ))
+    deps = [e['m']['match_id'] for e in day_entries]
+    sig = page_signature([BUILD_KEY, day.isoformat(), TODAY_DATE.isoformat()], deps, match_hashes)
+    return ('day', fname, sig, deps, (day, fname, day_entries))
+
+def plan_channel(ch_name, listed, match_hashes):
+    c_entries = sorted(listed.values(), key=lambda e: e['m']['kickoff'])
+    deps = [e['m']['match_id'] for e in c_entries]
+    sig = page_signature([BUILD_KEY, ch_name, TODAY_DATE.isoformat()], deps, match_hashes)
+    return ('channel', f"channel/{slugify(ch_name)}/index.html", sig, deps, (ch_name, c_entries))
+
+def api_job(job):
+    """The JSON shard of a day or channel page; it is built from the same inputs, so it shares the signature"""
+    kind, _, sig, deps, args = job
+    if kind == 'day':
+        day, _, day_entries = args
+        return ('day_api', f"api/day/{day.isoformat()}.json", sig, deps, (day, day_entries))
+    ch_name, c_entries = args
+    return ('channel_api', f"api/channel/{slugify(ch_name)}.json", sig, deps, (ch_name, c_entries))
+
+def plan_pages(index, match_hashes):
+    """List every page of the site in serial build order.
+
+    Each job is (kind, rel_path, signature, deps, render_args).
+    """
+    jobs = []
+
+    print("Planning match pages...")
+    for e in index['entries']:
+        jobs.append(plan_match(e, match_hashes))
+
+    print("Planning daily pages...")
+    for day in sorted(index['by_day']):
+        jobs.append(plan_day(day, index['by_day'][day], match_hashes))
+        jobs.append(api_job(jobs[-1]))
+
+    print("Planning channel pages...")
+    # Sorted, so which of two colliding channel names wins does not depend on match order
+    for ch_name, listed in sorted(index['by_channel'].items()):
+        jobs.append(plan_channel(ch_name, listed, match_hashes))
+        jobs.append(api_job(jobs[-1]))
+    return jobs
+
+def render_jobs(jobs):
+    """Render and write a list of page jobs in order, returning (rel_path, manifest record) pairs"""
+    records = []
+    for kind, rel_path, sig, deps, args in jobs:
+        records.append((rel_path, write_page(rel_path, sig, deps, RENDERERS[kind](*args))))
+    return records
+
+def render_parallel(jobs, workers, now):
+    """Render jobs across a process pool.
+
+    Jobs are sharded by output path, so pages that collide on a path stay in one shard in their
+    serial order and the later one still wins. Records come back in shard order, and dist/ is
+    byte-identical to a serial build.
+    """
+    n_shards = workers * 4
+    shards = [[] for _ in range(n_shards)]
+    for job in jobs:
+        shards[zlib.crc32(job[1].encode('utf-8')) % n_shards].append(job)
+
+    records = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_build, initargs=(now, PRECOMPRESS, OUT_DIR)) as pool:
+        for shard_records in pool.map(render_jobs, [s for s in shards if s]):
+            records.extend(shard_records)
+    return records
+
+# --- STREAMING BUILD (--stream) ---
+# A full rebuild that never holds more than a few days of matches. Source days (archive packs,
+# then the date/ listings in the store) are read twice: a first pass keeps only match ids, to find
+# the last source day listing each match (its record wins, like in load_archive()) and the last
+# source day adding to each local day. The second pass renders every local day as soon as that
+# source is read. Channel listings, manifest records and sitemap entries are spilled to disk on
+# the way and merged at the end. The pages written are the same as a full build's; only the
+# sitemap is in day order instead of sorted.
+CHANNEL_BUCKETS = 64
+
+def stream_sources(store, packs):
+    """(source day, matches) for every archived and active day, oldest first.
+
+    A day still in date/ wins over a leftover copy in its pack; active matches come from the store
+    (freshest record) and are skipped in the packs.
+    """
+    active_days = set(store.days())
+    active_ids = set(store.listed_days())
+    sources = sorted([(d, False) for d in packs.days() if d not in active_days] + [(d, True) for d in active_days])
+    for day, active in sources:
+        if active:
+            yield day, store.fixtures_for_day(day)
+        else:
+            yield day, [m for m in packs.load_day(day) if m.get('match_id') not in active_ids]
+
+class StreamBuild:
+    def __init__(self, spill_dir, store, packs, previous):
+        self.spill_dir = spill_dir
+        self.previous = previous  # last build's pages, for stamp_changed()
+        self.store = store
+        self.packs = packs
+        self.listed = store.listed_days()
+        self.active_ids = set(self.listed)
+        active_days = sorted(store.days())
+        self.boundary = datetime.strptime(active_days[0], '%Y%m%d').date() if active_days else None
+        self.active_channels = set()
+        self.on_boundary = []  # active matches on the boundary days, for history_state()
+
+        self.sitemap = SitemapWriter(OUT_DIR, DOMAIN)
+        self.search = SearchIndex()
+        self.spills = {name: open(os.path.join(spill_dir, name), "w", encoding="utf-8")
+                       for name in ("matches", "pages", "history")}
+        self.buckets = [open(os.path.join(spill_dir, f"channels.{n}"), "w", encoding="utf-8")
+                        for n in range(CHANNEL_BUCKETS)]
+        self.rendered = 0
+        self.bytes_written = 0
+        self.payload = payload_totals([])
+
+    def write(self, job):
+        kind, rel_path, sig, deps, args = job
+        record = stamp_changed(write_page(rel_path, sig, deps, RENDERERS[kind](*args)), self.previous.get(rel_path))
+        self.spills["pages"].write(f"{json.dumps(rel_path)}:{json.dumps(record, separators=(',', ':'))}\n")
+        if rel_path.endswith('.html'):
+            self.sitemap.add(page_url(rel_path), record['changed'])
+        self.rendered += 1
+        self.bytes_written += record['size']
+        add_payload(self.payload, record)
+
+    def write_all(self, jobs, history_flags):
+        """Write jobs in order; a history page loses its path to an active page, like in main()"""
+        active_paths = {job[1] for job, hist in zip(jobs, history_flags) if not hist}
+        history = []
+        for job, hist in zip(jobs, history_flags):
+            if hist and job[1] in active_paths:
+                continue
+            self.write(job)
+            if hist and job[1] not in history:
+                history.append(job[1])
+        for rel_path in history:
+            self.spills["history"].write(json.dumps(rel_path) + "\n")
+
+    def flush_day(self, day, matches, listed_days):
+        """Render one local day: its match pages and day page; spill its channel listings"""
+        matches = sorted(matches, key=lambda m: (int(m['kickoff']), m['match_id']))
+        hashes = {str(m['match_id']): content_hash(m) for m in matches}
+        for mid, h in hashes.items():
+            self.spills["matches"].write(f'"{mid}":"{h}"\n')
+        index = build_match_index(matches, listed_days)
+
+        jobs = [plan_match(e, hashes) for e in index['entries']]
+        jobs.append(plan_day(day, index['by_day'][day], hashes))
+        jobs.append(api_job(jobs[-1]))
+        fill_search(self.search, index['entries'], self.active_ids)
+        self.write_all(jobs, [is_history(job, self.active_ids, self.active_channels, self.boundary) for job in jobs])
+
+        for m in matches:
+            if m['match_id'] in self.active_ids:
+                self.active_channels.update(ch for c in m.get('tv_channels', []) for ch in c['channels'])
+                if self.boundary and day <= self.boundary:
+                    self.on_boundary.append(m)
+        for ch_name, listed in index['by_channel'].items():
+            bucket = self.buckets[zlib.crc32(slugify(ch_name).encode('utf-8')) % CHANNEL_BUCKETS]
+            # A bare name still gets the channel its (maybe empty) page
+            bucket.write(json.dumps([ch_name]) + "\n")
+            for mid, e in listed.items():
+                m = e['m']
+                bucket.write(json.dumps([ch_name, int(m['kickoff']), mid, hashes[str(mid)], m['fixture'],
+                                         e['league'], e['url']], ensure_ascii=False) + "\n")
+
+    def plan_flushes(self):
+        """First pass: {match_id: index of its last source} and {local date: index of the last source adding to it}"""
+        last = {}  # match_id -> (source index, local date) of its latest listing
+        for n, (_, matches) in enumerate(stream_sources(self.store, self.packs)):
+            for m in matches:
+                if m.get('match_id') and m.get('kickoff'):
+                    local = datetime.fromtimestamp(int(m['kickoff']), tz=timezone.utc).astimezone(LOCAL_OFFSET).date()
+                    last[m['match_id']] = (n, local)
+        due = {}
+        for n, local in last.values():
+            due[local] = max(due.get(local, n), n)
+        return {mid: n for mid, (n, _) in last.items()}, due
+
+    def run(self):
+        last_source, due = self.plan_flushes()
+        pending = {}  # local date -> [matches]
+        listed_days = {}
+        for n, (source_day, matches) in enumerate(stream_sources(self.store, self.packs)):
+            for m in matches:
+                mid = m.get('match_id')
+                if not mid or not m.get('kickoff'):
+                    continue
+                listed_days.setdefault(mid, []).append(source_day)
+                # Only the latest listing of a rescheduled match is rendered
+                if last_source[mid] == n:
+                    local = datetime.fromtimestamp(int(m['kickoff']), tz=timezone.utc).astimezone(LOCAL_OFFSET).date()
+                    pending.setdefault(local, []).append(m)
+            for day in sorted(d for d in pending if due[d] <= n):
+                self._flush(day, pending, listed_days)
+        self.finish_channels()
+        for ch_name in self.active_channels:
+            self.search.add_channel(ch_name, f"/channel/{slugify(ch_name)}/")
+
+    def _flush(self, day, pending, listed_days):
+        matches = pending.pop(day)
+        self.flush_day(day, matches, listed_days)
+        for m in matches:
+            listed_days.pop(m['match_id'], None)
+
+    def finish_channels(self):
+        """Merge each channel bucket and render its channel pages"""
+        for n, bucket in enumerate(self.buckets):
+            bucket.close()
+            rows, names = [], set()
+            with open(bucket.name, "r", encoding="utf-8") as f:
+                for line in f:
+                    row = json.loads(line)
+                    names.add(row[0])
+                    if len(row) > 1:
+                        rows.append(row)
+            os.unlink(bucket.name)
+
+            listed, hashes = {name: {} for name in names}, {}
+            for ch_name, kickoff, mid, h, fixture, league, url in sorted(rows, key=lambda r: (r[1], r[2])):
+                hashes[str(mid)] = h
+                listed[ch_name].setdefault(mid, {
+                    'm': {'match_id': mid, 'kickoff': kickoff, 'fixture': fixture},
+                    'dt': datetime.fromtimestamp(kickoff, tz=timezone.utc).astimezone(LOCAL_OFFSET),
+                    'league': league,
+                    'url': url,
+                })
+            # Sorted like plan_pages(), so colliding names resolve the same way
+            jobs = []
+            for ch_name in sorted(names):
+                jobs.append(plan_channel(ch_name, listed[ch_name], hashes))
+                jobs.append(api_job(jobs[-1]))
+            self.write_all(jobs, [is_history(job, self.active_ids, self.active_channels, self.boundary) for job in jobs])
+
+    def write_manifest(self, state, release_id):
+        """Assemble the manifest from the spill files without loading them"""
+        for f in self.spills.values():
+            f.close()
+        tmp_path = MANIFEST_PATH + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as out:
+            out.write(f'{{"version":{MANIFEST_VERSION},"release":{json.dumps(release_id)}')
+            for section, name, sep in (("matches", "matches", ","), ("pages", "pages", ",")):
+                out.write(f',"{section}":{{')
+                with open(self.spills[name].name, "r", encoding="utf-8") as f:
+                    for n, line in enumerate(f):
+                        out.write((sep if n else "") + line.rstrip("\n"))
+                out.write("}")
+            out.write(f',"history":{{"state":{json.dumps(state)},"pages":[')
+            with open(self.spills["history"].name, "r", encoding="utf-8") as f:
+                for n, line in enumerate(f):
+                    out.write(("," if n else "") + line.rstrip("\n"))
+            out.write("]}}")
+        os.replace(tmp_path, MANIFEST_PATH)
+
+def build_streaming(metrics, releases):
+    with metrics.stage("load"):
+        store = MatchStore()
+        imported = store.sync_files(payloads=False)
+        if imported:
+            print(f"Match store: imported {imported} changed fixture files")
+        packs = ArchivePacks()
+        # Only what lastmod tracking needs from the last build, not its dependency lists
+        previous = {rel_path: {'output': r.get('output'), 'changed': r.get('changed')}
+                    for rel_path, r in load_manifest()['pages'].items()}
+    with tempfile.TemporaryDirectory(prefix="build-spill-") as spill_dir:
+        stream = StreamBuild(spill_dir, store, packs, previous)
+        print(f"Streaming {len(packs.days())} archived and {len(store.days())} active days...")
+        with metrics.stage("stream"):
+            stream.run()
+            # Without a page for today the home URL is still listed, dated like in main()
+            stream.sitemap.add(DOMAIN + "/", stream.sitemap.newest or NOW.isoformat(timespec='seconds'))
+            shards = stream.sitemap.close()
+            docs, terms = stream.search.write(os.path.join(OUT_DIR, "api", "search"))
+            write_assets()
+        with metrics.stage("publish"):
+            release_id = publish(releases)
+            stream.write_manifest(history_state(packs, stream.boundary, stream.on_boundary, stream.active_channels),
+                                  release_id)
+    store.close()
+    metrics.count("pages_rendered", stream.rendered)
+    metrics.count("bytes_written", stream.bytes_written)
+    metrics.section("payload", stream.payload)
+    print(describe(stream.payload))
+    print(f"Search index: {docs} docs in {terms} term shards")
+    print(f"Pages: {stream.rendered} rendered, {stream.sitemap.count} sitemap entries in {shards} shards")
+
+def write_assets():
+    """The shared stylesheet, .nojekyll and 404.html, plus precompressed siblings of them and the sitemap index"""
+    write_stylesheet(OUT_DIR, PRECOMPRESS)
+    # GitHub Pages files; every release carries its own, dist/ is not tracked in git
+    open(os.path.join(OUT_DIR, ".nojekyll"), 'wb').close()
+    with open(NOT_FOUND_PAGE, 'rb') as f:
+        data = f.read()
+    with open(os.path.join(OUT_DIR, "404.html"), 'wb') as f:
+        f.write(data)
+    write_siblings(os.path.join(OUT_DIR, "404.html"), data, PRECOMPRESS)
+    sitemap_path = os.path.join(OUT_DIR, "sitemap.xml")
+    if PRECOMPRESS and os.path.exists(sitemap_path):
+        with open(sitemap_path, 'rb') as f:
+            write_siblings(sitemap_path, f.read(), PRECOMPRESS)
+
+def publish(releases):
+    """Publish the finished OUT_DIR as dist/ and clean up old releases in the background; returns its id"""
+    release_id = releases.finish(OUT_DIR)
+    releases.publish(release_id)
+    releases.collect_in_background()
+    print(f"Published release {release_id}")
+    return release_id
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the static TV listings site into dist/")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only re-render pages whose inputs changed since the last build, reuse the rest from dist/")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="render pages in N worker processes (0 = one per CPU)")
+    parser.add_argument("--stream", action="store_true",
+                        help="full rebuild day by day with bounded memory (for large history backfills)")
+    parser.add_argument("--metrics", metavar="DIR",
+                        help="write a JSON report of stage timings and page counts to DIR (default: $METRICS_DIR)")
+    parser.add_argument("--precompress", action="store_true",
+                        help="also write .gz (and .br, with the brotli module) siblings of every page and the sitemap index")
+    parser.add_argument("--keep-releases", type=int, default=KEEP_RELEASES, metavar="N",
+                        help=f"releases kept under releases/ for rollback (default: {KEEP_RELEASES})")
+    parser.add_argument("--profile", metavar="STAGE",
+                        help="also write a cProfile dump of one stage (init, load, plan, match_pages, day_pages, "
+                             "channel_pages, day_api_pages, channel_api_pages, sitemap, search_index, publish; "
+                             "stream for --stream)")
+    args = parser.parse_args(argv)
+    if args.stream and (args.incremental or args.jobs != 1):
+        parser.error("--stream is a serial full rebuild, it cannot be combined with --incremental or --jobs")
+    workers = args.jobs or os.cpu_count() or 1
+    metrics = RunMetrics("build", args.metrics, args.profile)
+
+    releases = ReleaseManager(keep=args.keep_releases)
+
+    with metrics.stage("init"):
+        # A new release directory per build; dist/ keeps serving the last one until publish()
+        out_dir = releases.start(time.strftime('%Y%m%dT%H%M%SZ', time.gmtime()))
+        init_build(datetime.now(LOCAL_OFFSET), encodings() if args.precompress else (), out_dir)
+
+    if args.stream:
+        build_streaming(metrics, releases)
+        metrics.write()
+        print("✅ Build complete → dist/ (zero downtime)")
+        return
+
+    with metrics.stage("load"):
+        # Loaded by full builds too, for the sitemap's lastmod; only --incremental reuses pages from it
+        prev_manifest = load_manifest()
+        manifest = empty_manifest()
+        incremental = args.incremental
+        if incremental and prev_manifest.get('release') != releases.current():
+            # dist/ was rolled back (or is not a release yet): its pages are not the ones the manifest lists
+            print("dist/ is not the release the manifest describes: rendering every page")
+            incremental = False
+
+        all_matches, listed_days = load_matches()
+        active_ids = {m['match_id'] for m in all_matches}
+        active_channels = {ch for m in all_matches for c in m.get('tv_channels', []) for ch in c['channels']}
+        active_days = sorted({day for days in listed_days.values() for day in days})
+        boundary = datetime.strptime(active_days[0], '%Y%m%d').date() if active_days else None
+
+        packs = ArchivePacks()
+        manifest['history']['state'] = history_state(packs, boundary, all_matches, active_channels)
+        carried = []
+        prev_history = prev_manifest.get('history', {})
+        if incremental and prev_history.get('state') == manifest['history']['state'] \
+                and history_intact(prev_history['pages'], prev_manifest['pages']):
+            carried = prev_history['pages']
+            print(f"History unchanged: keeping {len(carried)} pages, archive not loaded")
+        else:
+            archived, archived_days = load_archive(packs, active_ids)
+            all_matches = sorted(all_matches + archived, key=lambda m: (int(m['kickoff']), m['match_id']))
+            listed_days.update(archived_days)
+            print(f"History: {len(archived)} matches loaded from {len(packs.days())} archived days")
+
+        for m in all_matches:
+            manifest['matches'][str(m['match_id'])] = content_hash(m)
+        if incremental:
+            changed = sum(1 for mid, h in manifest['matches'].items() if prev_manifest['matches'].get(mid) != h)
+            print(f"Incremental build: {changed} of {len(all_matches)} matches new or changed")
+
+    with metrics.stage("plan"):
+        index = build_match_index(all_matches, listed_days)
+        jobs = plan_pages(index, manifest['matches'])
+        search = SearchIndex()
+        fill_search(search, index['entries'], active_ids)
+        for ch_name in active_channels:
+            search.add_channel(ch_name, f"/channel/{slugify(ch_name)}/")
+
+        history_jobs = [is_history(job, active_ids, active_channels, boundary) for job in jobs]
+        active_paths = {job[1] for job, hist in zip(jobs, history_jobs) if not hist}
+        kept = 0
+        if carried:
+            # Without the archive these pages would come out incomplete; the kept ones stand in for them
+            jobs = [job for job, hist in zip(jobs, history_jobs) if not hist]
+            history = [p for p in carried if p not in active_paths]
+            for rel_path in history:
+                record = reuse_page(rel_path, prev_manifest['pages'][rel_path]['inputs'], prev_manifest['pages'])
+                if record:
+                    manifest['pages'][rel_path] = record
+                    kept += 1
+        else:
+            # Where a history page and an active page slugify to the same path, the active one wins in
+            # both modes, so the page does not depend on whether the archive was loaded
+            jobs = [job for job, hist in zip(jobs, history_jobs) if not (hist and job[1] in active_paths)]
+            history = {job[1] for job in jobs} - active_paths
+        manifest['history']['pages'] = sorted(history)
+
+        # Pages that several matches/channels slugify to are always re-rendered, so the later one wins
+        path_counts = Counter(job[1] for job in jobs)
+        pending = []
+        for job in jobs:
+            rel_path, sig = job[1], job[2]
+            record = None
+            if incremental and path_counts[rel_path] == 1:
+                record = reuse_page(rel_path, sig, prev_manifest['pages'])
+            if record:
+                manifest['pages'][rel_path] = record
+            else:
+                pending.append(job)
+
+    print(f"Rendering {len(pending)} pages" + (f" with {workers} workers..." if workers > 1 else "..."))
+    records = []
+    for kind in RENDERERS:
+        kind_jobs = [job for job in pending if job[0] == kind]
+        with metrics.stage(f"{kind}_pages"):
+            if workers > 1 and len(kind_jobs) > 1:
+                records += render_parallel(kind_jobs, workers, NOW)
+            else:
+                records += render_jobs(kind_jobs)
+        metrics.count(f"{kind}_pages_rendered", len(kind_jobs))
+    for rel_path, record in records:
+        stamp_changed(record, prev_manifest['pages'].get(rel_path))
+    manifest['pages'].update(records)
+    metrics.count("pages_reused", len(jobs) - len(pending) + kept)
+    metrics.count("bytes_written", sum(record['size'] for _, record in records))
+    # Reused pages plus re-rendered ones that came out byte-identical
+    metrics.count("pages_unchanged", len(jobs) - len(pending) + kept + sum(
+        1 for rel_path, record in records if prev_manifest['pages'].get(rel_path, {}).get('output') == record['output']))
+
+    # --- 7. SITEMAP ---
+    with metrics.stage("sitemap"):
+        print("Building sitemap...")
+        # Every page of this build (rendered, reused or carried) with the time its content last changed
+        lastmods = {page_url(rel_path): record['changed'] for rel_path, record in manifest['pages'].items()
+                    if rel_path.endswith('.html')}
+        # Without a page for today, the home URL changes whenever anything else does
+        lastmods.setdefault(DOMAIN + "/", max(lastmods.values(), default=NOW.isoformat(timespec='seconds')))
+        sitemap = SitemapWriter(OUT_DIR, DOMAIN)
+        for url in sorted(lastmods):
+            sitemap.add(url, lastmods[url])
+        shards = sitemap.close()
+        metrics.count("sitemap_urls", sitemap.count)
+        print(f"Sitemap: {sitemap.count} URLs in {shards} shards")
+        write_assets()
+
+    with metrics.stage("search_index"):
+        docs, terms = search.write(os.path.join(OUT_DIR, "api", "search"))
+        print(f"Search index: {docs} docs in {terms} term shards")
+
+    # --- 8. PUBLISH: Point dist/ at the new release ---
+    with metrics.stage("publish"):
+        manifest['release'] = publish(releases)
+        atomic_write(MANIFEST_PATH, json.dumps(manifest, separators=(',', ':')))
+    metrics.count("matches", len(all_matches))
+    payload = payload_totals(manifest['pages'].values())
+    metrics.section("payload", payload)
+    metrics.write()
+    print(describe(payload))
+    print(f"Pages: {len(records)} rendered, {len(jobs) - len(pending) + kept} reused")
+    print("✅ Build complete → dist/ (zero downtime)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Offset indexes for the per-day endpoint files in data/.
+
+Every data/<endpoint>/<date>.json is a dict keyed by match id. Next to it, <date>.idx.json maps each
+match id to [byte offset, byte length, sha1] of its value, so a reader can mmap the data file and
+parse only the matches it needs. The index also records the size and sha1 of the whole file it was
+built from; hashing the file is much cheaper than parsing it, and unlike an mtime it survives a
+git checkout. ingest.py writes both files together; indexes for older files
+are built on first use, or up front with:  python data_index.py data/*/*.json
+"""
+import hashlib
+import json
+import mmap
+import os
+import sys
+import tempfile
+
+ENDPOINTS = ["h2h", "lineups", "statistics", "odds", "form"]
+INDEX_VERSION = 2
+
+
+def index_path(path):
+    return path[:-len(".json")] + ".idx.json"
+
+
+def atomic_write(path, text):
+    """Write text to a temp file next to path and rename it over path, so readers never see a partial file"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(temp_path, path)
+    except:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def file_sha1(path):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return hashlib.sha1(b"").hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return hashlib.sha1(mm).hexdigest()
+
+
+def _save_index(path, data, entries):
+    atomic_write(index_path(path), json.dumps(
+        {"version": INDEX_VERSION, "size": len(data), "sha1": hashlib.sha1(data).hexdigest(), "entries": entries},
+        separators=(",", ":")))
+
+
+def write_indexed(path, data):
+    """Write a {match_id: payload} dict as one entry per line, together with its offset index"""
+    parts, entries = ["{"], {}
+    offset = 1
+    for n, (mid, value) in enumerate(data.items()):
+        # ASCII-only output (json's default), so string offsets are byte offsets
+        prefix = ("\n" if n == 0 else ",\n") + json.dumps(str(mid)) + ":"
+        body = json.dumps(value, separators=(",", ":"))
+        offset += len(prefix)
+        entries[str(mid)] = [offset, len(body), hashlib.sha1(body.encode("ascii")).hexdigest()]
+        offset += len(body)
+        parts.extend((prefix, body))
+    parts.append("\n}\n")
+    text = "".join(parts)
+    atomic_write(path, text)
+    _save_index(path, text.encode("ascii"), entries)
+
+
+def build_index(path):
+    """Scan an existing data file once and write its index"""
+    with open(path, "rb") as f:
+        raw = f.read()
+    # latin-1 maps every byte to one character, so parser positions are byte offsets even when
+    # the file holds UTF-8 text; only the value boundaries are needed, not the decoded values
+    text = raw.decode("latin-1")
+    decoder = json.JSONDecoder()
+    entries = {}
+
+    def skip_ws(pos):
+        while pos < len(text) and text[pos] in " \t\r\n":
+            pos += 1
+        return pos
+
+    pos = skip_ws(0)
+    if text[pos:pos + 1] != "{":
+        raise ValueError(f"{path}: not a JSON object")
+    pos = skip_ws(pos + 1)
+    while text[pos:pos + 1] != "}":
+        key, pos = decoder.raw_decode(text, pos)
+        pos = skip_ws(pos)
+        if text[pos:pos + 1] != ":":
+            raise ValueError(f"{path}: expected ':' at byte {pos}")
+        start = skip_ws(pos + 1)
+        _, end = decoder.raw_decode(text, start)
+        entries[key] = [start, end - start, hashlib.sha1(raw[start:end]).hexdigest()]
+        pos = skip_ws(end)
+        if text[pos:pos + 1] == ",":
+            pos = skip_ws(pos + 1)
+    _save_index(path, raw, entries)
+    return entries
+
+
+def load_index(path):
+    """Index entries for a data file, rebuilding the index if it is missing or does not match the file.
+
+    Raises ValueError if the data file itself is not a JSON object.
+    """
+    try:
+        with open(index_path(path), "r", encoding="utf-8") as f:
+            idx = json.load(f)
+        # Size first, it rejects most rewrites without reading the file
+        if idx.get("version") == INDEX_VERSION and idx.get("size") == os.path.getsize(path) \
+                and idx.get("sha1") == file_sha1(path):
+            return idx["entries"]
+    except (OSError, ValueError):
+        pass
+    return build_index(path)
+
+
+class EndpointData:
+    """Lazy, per-match reads from data/<endpoint>/<date>.json through the offset index and mmap.
+
+    A match is looked up in the day files it was listed under (its fixture file dates). Only the
+    indexes of days that are asked about are loaded, and only requested values are parsed.
+    """
+
+    def __init__(self, root="data"):
+        self.root = root
+        self._files = {}  # (endpoint, day) -> (mmap, entries) or None
+
+    def _open(self, endpoint, day):
+        key = (endpoint, day)
+        if key not in self._files:
+            path = os.path.join(self.root, endpoint, f"{day}.json")
+            opened = None
+            if os.path.exists(path) and os.path.getsize(path) > 0:
+                try:
+                    entries = load_index(path)
+                    with open(path, "rb") as f:
+                        opened = (mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), entries)
+                except (OSError, ValueError) as e:
+                    # Match data only enriches the pages; a broken file counts as missing
+                    print(f"Warning: Skipping {path}: {e}")
+            self._files[key] = opened
+        return self._files[key]
+
+    def _locate(self, endpoint, days, mid):
+        # Newest day first: a match listed on several days is refreshed in each, the latest file wins
+        for day in sorted(days, reverse=True):
+            opened = self._open(endpoint, day)
+            if opened and str(mid) in opened[1]:
+                return opened[0], opened[1][str(mid)]
+        return None, None
+
+    def digest(self, days, mid):
+        """{endpoint: content hash} for every endpoint holding data for mid, without parsing it"""
+        out = {}
+        for endpoint in ENDPOINTS:
+            _, entry = self._locate(endpoint, days, mid)
+            if entry:
+                out[endpoint] = entry[2]
+        return out
+
+    def get(self, endpoint, days, mid):
+        mm, entry = self._locate(endpoint, days, mid)
+        if entry is None:
+            return None
+        offset, length = entry[0], entry[1]
+        return json.loads(mm[offset:offset + length])
+
+    def close(self):
+        for opened in self._files.values():
+            if opened:
+                opened[0].close()
+        self._files = {}
+
+
+if __name__ == "__main__":
+    for data_path in sys.argv[1:]:
+        if data_path.endswith(".idx.json"):
+            continue
+        print(f"{data_path}: {len(build_index(data_path))} matches indexed")
@@ -0,0 +1,169 @@
+"""Reading and writing date/*.json fixture files.
+
+Fixture files used to be pretty-printed lists in which every match repeated the full country list
+and the same broadcaster names. The compact format interns countries and channels into tables and
+stores each match on one line, with its broadcasts as [country_id, [channel_id, ...]] pairs:
+
+    {"format":2,"countries":["Algeria",...],"channels":["beIN SPORTS 1",...],"matches":[
+    {"match_id":1,"kickoff":1768665600,...,"tv":[[0,[0,3]],[1,[2]]]},
+    ...
+    ]}
+
+load_fixtures() reads both layouts and always returns the original match dicts, so callers never
+see the difference. Convert existing files with:  python fixture_files.py date/*.json
+
+Days older than ARCHIVE_AFTER_DAYS move out of date/ into monthly packs, date/archive/<YYYYMM>.json,
+holding one compact fixture list per day on its own line. Each pack has a data_index offset index
+(<YYYYMM>.idx.json), so a single day is read without parsing the rest of the month, and listing the
+archived days only reads the indexes. Archive old days with:  python fixture_files.py --archive
+"""
+import glob
+import hashlib
+import json
+import mmap
+import os
+import sys
+from datetime import datetime, timedelta
+
+from data_index import atomic_write, load_index, write_indexed
+
+FORMAT_VERSION = 2
+
+DATE_DIR = "date"
+ARCHIVE_DIR = os.path.join(DATE_DIR, "archive")
+ARCHIVE_AFTER_DAYS = 14
+
+
+def expand_fixtures(data, path="<fixtures>"):
+    """Match dicts from a parsed legacy list or compact fixture object"""
+    if isinstance(data, list):
+        return data
+    if data.get("format") != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported fixture format {data.get('format')!r}")
+
+    countries, channels = data["countries"], data["channels"]
+    matches = []
+    for m in data["matches"]:
+        tv = m.pop("tv", None)
+        if tv is not None:
+            # Table lookups hand out the same str objects, so names are shared across matches
+            m["tv_channels"] = [
+                {"country": countries[c], "channels": [channels[ch] for ch in chs]} for c, chs in tv
+            ]
+        matches.append(m)
+    return matches
+
+
+def load_fixtures(path):
+    """List of match dicts (with 'tv_channels') from a legacy or compact fixture file"""
+    with open(path, "r", encoding="utf-8") as f:
+        return expand_fixtures(json.load(f), path)
+
+
+def compact_fixtures(matches):
+    """The compact fixture object for a list of match dicts"""
+    countries, channels = {}, {}
+    rows = []
+    for m in matches:
+        row = {k: v for k, v in m.items() if k != "tv_channels"}
+        if "tv_channels" in m:
+            row["tv"] = [
+                [countries.setdefault(c["country"], len(countries)),
+                 [channels.setdefault(ch, len(channels)) for ch in c["channels"]]]
+                for c in m["tv_channels"]
+            ]
+        rows.append(row)
+    return {"format": FORMAT_VERSION, "countries": list(countries), "channels": list(channels), "matches": rows}
+
+
+def dumps_fixtures(matches):
+    data = compact_fixtures(matches)
+    rows = [json.dumps(row, ensure_ascii=False, separators=(",", ":")) for row in data.pop("matches")]
+    header = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    # One match per line keeps git diffs of bot commits readable
+    return header[:-1] + ',"matches":[\n' + ",\n".join(rows) + "\n]}\n"
+
+
+def save_fixtures(path, matches):
+    """Write matches in the compact format, atomically"""
+    atomic_write(path, dumps_fixtures(matches))
+
+
+def convert(paths):
+    for path in paths:
+        before = os.path.getsize(path)
+        save_fixtures(path, load_fixtures(path))
+        after = os.path.getsize(path)
+        print(f"{path}: {before:,} -> {after:,} bytes")
+
+
+# --- MONTHLY ARCHIVE PACKS ---
+def pack_path(month, archive_dir=ARCHIVE_DIR):
+    return os.path.join(archive_dir, f"{month}.json")
+
+
+def archive_days(before_day, date_dir=DATE_DIR, archive_dir=ARCHIVE_DIR):
+    """Move date/<day>.json files older than before_day (YYYYMMDD) into their monthly packs.
+
+    The pack is written before the day files are removed, so an interrupted run loses nothing;
+    running it again just repacks the days still left in date/.
+    """
+    by_month = {}
+    for path in sorted(glob.glob(os.path.join(date_dir, "*.json"))):
+        day = os.path.basename(path)[:-len(".json")]
+        if day.isdigit() and day < before_day:
+            by_month.setdefault(day[:6], []).append((day, path))
+
+    for month, days in sorted(by_month.items()):
+        target = pack_path(month, archive_dir)
+        packed = {}
+        if os.path.exists(target):
+            with open(target, "r", encoding="utf-8") as f:
+                packed = json.load(f)
+        for day, path in days:
+            packed[day] = compact_fixtures(load_fixtures(path))
+        write_indexed(target, dict(sorted(packed.items())))
+        for day, path in days:
+            os.unlink(path)
+        print(f"{target}: {len(days)} days archived, {len(packed)} in pack")
+
+
+class ArchivePacks:
+    """Read access to the monthly packs: which days they hold, a digest of them, and single days."""
+
+    def __init__(self, archive_dir=ARCHIVE_DIR):
+        self.archive_dir = archive_dir
+        self._indexes = None
+
+    def _load_indexes(self):
+        if self._indexes is None:
+            self._indexes = {}
+            for path in sorted(glob.glob(os.path.join(self.archive_dir, "*.json"))):
+                if not path.endswith(".idx.json"):
+                    self._indexes[path] = load_index(path)
+        return self._indexes
+
+    def days(self):
+        return sorted(day for entries in self._load_indexes().values() for day in entries)
+
+    def digest(self):
+        """Hash over the content hashes of every archived day (changes whenever any pack does)"""
+        parts = [[day, entry[2]] for entries in self._load_indexes().values() for day, entry in sorted(entries.items())]
+        return hashlib.sha1(json.dumps(parts).encode("utf-8")).hexdigest()
+
+    def load_day(self, day):
+        """Match dicts of one archived day, or [] if no pack holds it"""
+        path = pack_path(day[:6], self.archive_dir)
+        entry = self._load_indexes().get(path, {}).get(day)
+        if entry is None:
+            return []
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            data = json.loads(mm[entry[0]:entry[0] + entry[1]])
+        return expand_fixtures(data, f"{path}[{day}]")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--archive"]:
+        archive_days((datetime.now() - timedelta(days=ARCHIVE_AFTER_DAYS)).strftime("%Y%m%d"))
+    else:
+        convert(sys.argv[1:])
@@ -0,0 +1,186 @@
+import json
+import os
+import re
+import sqlite3
+import time
+import zlib
+
+# --- CONFIGURATION ---
+CACHE_PATH = ".cache/http.sqlite"
+MAX_CACHE_BYTES = 200 * 1024 * 1024
+
+# How long a response is served without asking SofaScore again, per endpoint family.
+# Once it expires it is revalidated with If-None-Match / If-Modified-Since (a 304 keeps the body).
+ENDPOINT_TTLS = [
+    ("schedule", re.compile(r"/scheduled-events/"), 15 * 60),
+    ("channel", re.compile(r"/tv/channel/\d+/schedule$"), 24 * 3600),
+    ("tv", re.compile(r"/tv/event/\d+/country-channels$"), 6 * 3600),
+    ("h2h", re.compile(r"/event/\d+/h2h$"), 24 * 3600),
+    ("lineups", re.compile(r"/event/\d+/lineups$"), 10 * 60),
+    ("statistics", re.compile(r"/event/\d+/statistics$"), 5 * 60),
+    ("odds", re.compile(r"/event/\d+/provider/\d+/winning-odds$"), 3600),
+    ("form", re.compile(r"/event/\d+/pregame-form$"), 12 * 3600),
+    ("event", re.compile(r"/event/\d+$"), 30 * 60),
+]
+DEFAULT_TTL = 0
+
+
+def endpoint_family(url):
+    path = url.split("?", 1)[0]
+    for family, pattern, ttl in ENDPOINT_TTLS:
+        if pattern.search(path):
+            return family, ttl
+    return "other", DEFAULT_TTL
+
+
+class CachedResponse:
+    """Stands in for an HTTP response when the body comes from the cache."""
+
+    from_cache = True
+
+    def __init__(self, content, headers):
+        self.status_code = 200
+        self.content = content
+        self.headers = headers
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class ResponseCache:
+    """URL-keyed response store in SQLite with per-endpoint TTLs and LRU eviction by total size."""
+
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_CACHE_BYTES, ttls=None):
+        self.max_bytes = max_bytes
+        self.ttls = ttls or {}
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "stored": 0, "evicted": 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        # Commits then skip the fsync; a crash can lose the last few responses, which are fetched again
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self.db.commit()
+        # Bytes stored, kept up to date by store() and evict() so neither has to sum the table
+        self.total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def ttl(self, url):
+        family, ttl = endpoint_family(url)
+        return self.ttls.get(family, ttl)
+
+    def lookup(self, url):
+        """Cached entry for url as a dict with a 'fresh' flag, or None"""
+        row = self.db.execute(
+            "SELECT body, etag, last_modified, fetched_at FROM responses WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        body, etag, last_modified, fetched_at = row
+        return {
+            "body": zlib.decompress(body),
+            "etag": etag,
+            "last_modified": last_modified,
+            "fresh": time.time() - fetched_at < self.ttl(url),
+        }
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url, content, headers):
+        body = zlib.compress(content)
+        now = time.time()
+        old = self.db.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+        self.db.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (url, body, len(body), headers.get("ETag"), headers.get("Last-Modified"), now, now),
+        )
+        self.db.commit()
+        self.total += len(body) - (old[0] if old else 0)
+        self.stats["stored"] += 1
+        if self.total > self.max_bytes:
+            self.evict()
+
+    def touch(self, url, fetched=False):
+        """Mark an entry as used; fetched=True also restarts its TTL (after a 304)"""
+        now = time.time()
+        if fetched:
+            self.db.execute("UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+        else:
+            self.db.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (now, url))
+        self.db.commit()
+
+    def evict(self):
+        """Drop least recently used entries until the cache is back under 90% of max_bytes"""
+        if self.total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        for url, size in self.db.execute("SELECT url, size FROM responses ORDER BY accessed_at").fetchall():
+            if self.total <= target:
+                break
+            self.db.execute("DELETE FROM responses WHERE url = ?", (url,))
+            self.total -= size
+            self.stats["evicted"] += 1
+        self.db.commit()
+
+    def report(self):
+        s = self.stats
+        return (f"HTTP cache: {s['hits']} hits, {s['revalidated']} revalidated (304), "
+                f"{s['misses']} misses, {s['evicted']} evicted")
+
+    def close(self):
+        self.db.close()
+
+    # --- request wrappers ---
+    def begin(self, url, kwargs):
+        """Returns (cached response or None, cache entry or None); adds conditional headers to kwargs"""
+        entry = self.lookup(url)
+        if entry is None:
+            return None, None
+        if entry["fresh"]:
+            self.stats["hits"] += 1
+            self.touch(url)
+            return CachedResponse(entry["body"], {}), entry
+        kwargs["headers"] = {**(kwargs.get("headers") or {}), **self.conditional_headers(entry)}
+        return None, entry
+
+    def finish(self, url, entry, res):
+        if res.status_code == 304 and entry is not None:
+            self.stats["revalidated"] += 1
+            self.touch(url, fetched=True)
+            return CachedResponse(entry["body"], res.headers)
+        self.stats["misses"] += 1
+        if res.status_code == 200:
+            self.store(url, res.content, res.headers)
+        return res
+
+
+class CachedAsyncSession:
+    """Wraps an AsyncSession so get() goes through the cache."""
+
+    def __init__(self, session, cache):
+        self.session = session
+        self.cache = cache
+
+    async def get(self, url, **kwargs):
+        cached, entry = self.cache.begin(url, kwargs)
+        if cached is not None:
+            return cached
+        return self.cache.finish(url, entry, await self.session.get(url, **kwargs))
@@ -0,0 +1,563 @@
+"""One ingestion run for SofaScore data: schedule -> normalize -> TV -> per-match endpoints.
+
+Replaces the separate scraper.py (tomorrow's schedule), future_scraper.py (+1..+7 days with TV
+listings) and fetch_data.py (per-match endpoints around kickoff), which now only call this with
+their old stages and window. All requests share one AsyncSession behind the response cache and
+request scheduler, and every stage writes through the match store, so date/ and data/ come out
+in one schema whichever workflow ran.
+
+Days flow through the stages over small bounded queues: while one day's TV listings resolve, the
+next day's schedule is being fetched and an earlier day's endpoints stored. The request
+scheduler, not the pipeline, limits how hard SofaScore is hit.
+
+    python ingest.py                                        # every stage, yesterday to +7 days
+    python ingest.py --stages schedule --from 1 --to 1      # scraper.py
+    python ingest.py --stages schedule,tv --from 1 --to 7   # future_scraper.py
+    python ingest.py --stages endpoints --from -1 --to 3    # fetch_data.py
+
+Without the schedule stage, the TV and endpoint stages work on the fixtures already in the store.
+"""
+import argparse
+import asyncio
+import functools
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from curl_cffi.requests import AsyncSession
+
+try:
+    import pycountry
+except ImportError:  # only the TV stage needs country names
+    pycountry = None
+
+from data_index import atomic_write
+from http_cache import CachedAsyncSession, ResponseCache
+from match_store import MatchStore
+from metrics import RunMetrics
+from request_scheduler import RequestScheduler, ScheduledAsyncSession
+
+# --- CONFIGURATION ---
+# Benchmarks point both at the local stand-in server (bench/stub_server.py)
+SOFASCORE_API = os.environ.get("SOFASCORE_API", "https://api.sofascore.com/api/v1")
+SCHEDULE_API = os.environ.get("SOFASCORE_API", "https://www.sofascore.com/api/v1")
+
+STAGES = ["schedule", "tv", "endpoints"]
+STAGE_WORKERS = 2  # days each stage works on at once
+QUEUE_SIZE = 2     # days waiting between two stages
+
+# Channel names rarely change; keep them between runs instead of one request per (match, country, channel)
+CHANNEL_NAMES_PATH = ".cache/channel_names.json"
+CHANNEL_NAME_TTL = 7 * 86400
+
+ENDPOINTS = {
+    "h2h": "h2h",
+    "lineups": "lineups",
+    "statistics": "statistics",
+    "odds": "provider/1/winning-odds",
+    "form": "pregame-form"
+}
+
+# When each endpoint is worth fetching, relative to kickoff (seconds):
+#   start - do not fetch before kickoff + start
+#   until - the data stops changing at kickoff + until (None = when the match is over)
+#   every - minimum age of the stored copy before it is fetched again
+# After the window closes an endpoint is fetched once more and then marked final.
+REFRESH_RULES = {
+    "h2h": {"start": -48 * 3600, "until": 0, "every": 24 * 3600},
+    "form": {"start": -48 * 3600, "until": 0, "every": 12 * 3600},
+    "odds": {"start": -24 * 3600, "until": 0, "every": 3 * 3600},
+    "lineups": {"start": -90 * 60, "until": None, "every": 15 * 60},
+    "statistics": {"start": 0, "until": None, "every": 0},
+}
+
+# The schedule's status is only as fresh as the last schedule run, so without a final status a
+# match counts as over this long after kickoff
+MATCH_DURATION = 3 * 3600
+FINISHED_STATUSES = {"finished", "canceled", "postponed", "abandoned"}
+# No lineups or statistics will ever come for these
+CALLED_OFF_STATUSES = {"canceled", "postponed"}
+# An endpoint without coverage (404) is asked again no sooner than this, and not at all once final
+MISS_RETRY = 3600
+
+STATE_PATH = "data/fetch_state.json"
+STATE_RETENTION = 7 * 86400
+
+async def fetch_json(session, url, timeout=10):
+    """GET a SofaScore URL; the JSON body, or None on any failure"""
+    try:
+        # impersonate="chrome120" makes the TLS fingerprint look like a real browser
+        res = await session.get(url, impersonate="chrome120", timeout=timeout)
+        if res.status_code == 200:
+            return res.json()
+        print(f"[-] Failed with status {res.status_code} at {url}")
+    except Exception as e:
+        print(f"[-] Request error at {url}: {e}")
+    return None
+
+# --- TV LISTINGS ---
+async def get_channel_name(session, channel_id):
+    """Fetches the actual name of a channel (e.g., 'Sky Sports') from its ID."""
+    url = f"{SOFASCORE_API}/tv/channel/{channel_id}/schedule"
+    try:
+        res = await session.get(url, impersonate="chrome120", timeout=5)
+        if res.status_code == 200:
+            data = res.json()
+            return data.get('channel', {}).get('name', 'Unknown Channel')
+    except:
+        pass
+    return "Unknown Channel"
+
+class ChannelNames:
+    """Persistent channel id -> name map with a TTL; concurrent lookups of one id share a single request."""
+
+    def __init__(self, path=CHANNEL_NAMES_PATH, ttl=CHANNEL_NAME_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.names = {}      # id -> [name, resolved_at]
+        self.in_flight = {}  # id -> Task
+        self.stats = {"cached": 0, "coalesced": 0, "fetched": 0}
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.names = json.load(f)
+        except (OSError, ValueError):
+            self.names = {}
+
+    def save(self):
+        atomic_write(self.path, json.dumps(self.names, ensure_ascii=False))
+
+    async def _fetch(self, session, channel_id):
+        self.stats["fetched"] += 1
+        name = await get_channel_name(session, channel_id)
+        if name != "Unknown Channel":
+            # Failures are not remembered, the next lookup tries again
+            self.names[str(channel_id)] = [name, int(time.time())]
+        return name
+
+    async def resolve(self, session, channel_id):
+        key = str(channel_id)
+        known = self.names.get(key)
+        if known and time.time() - known[1] < self.ttl:
+            self.stats["cached"] += 1
+            return known[0]
+
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(session, channel_id))
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        else:
+            self.stats["coalesced"] += 1
+        # shield: one cancelled caller must not cancel the lookup the others are waiting on
+        return await asyncio.shield(task)
+
+    def report(self):
+        s = self.stats
+        return f"Channel names: {s['cached']} cached, {s['coalesced']} coalesced, {s['fetched']} fetched"
+
+channel_names = ChannelNames()
+
+@functools.lru_cache(maxsize=None)
+def country_name(country_code):
+    """Convert "AD" to "Andorra" """
+    try:
+        return pycountry.countries.get(alpha_2=country_code).name
+    except (AttributeError, LookupError):
+        return country_code # Fallback if not found (or pycountry is not installed)
+
+async def get_tv_data(session, match_id):
+    """Fetches country-specific TV channels and resolves their names."""
+    tv_url = f"{SOFASCORE_API}/tv/event/{match_id}/country-channels"
+    broadcasters = []
+    try:
+        res = await session.get(tv_url, impersonate="chrome120", timeout=10)
+        if res.status_code != 200: return []
+
+        country_channels = res.json().get('countryChannels', {})
+
+        for country_code, channel_ids in country_channels.items():
+            full_country = country_name(country_code)
+
+            channel_tasks = [channel_names.resolve(session, cid) for cid in channel_ids]
+            names = await asyncio.gather(*channel_tasks)
+
+            # Sorted, so unchanged listings serialise identically between runs
+            clean_names = sorted(set(n for n in names if n != "Unknown Channel"))
+
+            broadcasters.append({
+                "country": full_country,
+                "channels": clean_names if clean_names else ["TBA"]
+            })
+
+        return sorted(broadcasters, key=lambda x: x['country'])
+    except:
+        return []
+
+def known_venue(venue):
+    """A venue name, or None for a missing one or the 'TBA' placeholder older runs stored"""
+    return venue if venue and venue != "TBA" else None
+
+def venue_checked(record):
+    """Whether the event record was already fetched and had no venue (older runs stored 'TBA' for that)"""
+    return bool(record.get('no_venue')) or record.get('venue') == "TBA"
+
+async def fetch_venue(session, match_id):
+    """Fetches the venue name from the full event record (the schedule feed often omits it):
+    "" for an event without one, None when the request failed."""
+    event_url = f"{SOFASCORE_API}/event/{match_id}"
+    try:
+        res = await session.get(event_url, impersonate="chrome120", timeout=10)
+        if res.status_code != 200: return None
+        return (res.json().get('event', {}).get('venue') or {}).get('name') or ""
+    except:
+        return None
+
+# --- PER-MATCH ENDPOINTS ---
+async def fetch_sofa_endpoint(session, mid, endpoint_key, path):
+    """Fetches a specific SofaScore endpoint for a single match: (key, data or None, HTTP status or None)."""
+    url = f"{SOFASCORE_API}/event/{mid}/{path}"
+    try:
+        res = await session.get(url, impersonate="chrome120", timeout=10)
+        if res.status_code == 200:
+            return endpoint_key, res.json(), 200
+        return endpoint_key, None, res.status_code
+    except Exception as e:
+        print(f"Error fetching {endpoint_key} for {mid}: {e}")
+    return endpoint_key, None, None
+
+class DayBuffer:
+    """Collects endpoint payloads for one day in memory; flush() stores them and writes each data/<endpoint>/<date>.json once."""
+
+    def __init__(self, date_str, store):
+        self.date_str = date_str
+        self.store = store
+        self.pending = {key: {} for key in ENDPOINTS}
+
+    def add(self, folder, mid, data):
+        # All coroutines share one event loop thread, so plain dict updates cannot lose writes
+        self.pending[folder][str(mid)] = data
+
+    def flush(self):
+        for folder, updates in self.pending.items():
+            if not updates:
+                continue
+            # One transaction per endpoint, then the day's file (and its offset index) is exported
+            # with everything earlier runs stored for it
+            self.store.upsert_payloads(folder, self.date_str, updates)
+            self.store.export_payloads(folder, self.date_str)
+            self.pending[folder] = {}
+
+class RefreshScheduler:
+    """Decides which endpoints are due for a match, from its kickoff/status and data/fetch_state.json.
+
+    The state file records per match and endpoint when it was last fetched and whether it is final.
+    """
+
+    def __init__(self, now=None):
+        self.now = now or time.time()
+        self.state = {}
+        if os.path.exists(STATE_PATH):
+            try:
+                with open(STATE_PATH, "r", encoding='utf-8') as f:
+                    self.state = json.load(f)
+            except: self.state = {}
+
+    def is_over(self, match):
+        if match.get('status') in FINISHED_STATUSES:
+            return True
+        return self.now > int(match['kickoff']) + MATCH_DURATION
+
+    def window_closed(self, match, endpoint):
+        until = REFRESH_RULES[endpoint]["until"]
+        if until is None:
+            return self.is_over(match)
+        return self.now > int(match['kickoff']) + until
+
+    def due_endpoints(self, match):
+        if match.get('status') in CALLED_OFF_STATUSES:
+            return []
+        kickoff = int(match['kickoff'])
+        seen = self.state.get(str(match['match_id']), {})
+        due = []
+        for endpoint, rule in REFRESH_RULES.items():
+            last = seen.get(endpoint)
+            if last and last["final"]:
+                continue
+            if self.now < kickoff + rule["start"]:
+                continue
+            every = max(rule["every"], MISS_RETRY) if last and last.get("missing") else rule["every"]
+            if last is None or self.window_closed(match, endpoint) or self.now - last["fetched"] >= every:
+                due.append(endpoint)
+        return due
+
+    def mark_fetched(self, match, endpoint, missing=False):
+        """Record a fetch; a miss (no coverage) counts too, so it is not asked again on every run"""
+        seen = self.state.setdefault(str(match['match_id']), {"kickoff": int(match['kickoff'])})
+        seen[endpoint] = {"fetched": int(self.now), "final": self.window_closed(match, endpoint)}
+        if missing:
+            seen[endpoint]["missing"] = True
+
+    def save(self):
+        # Forget matches long past, their endpoints are all final anyway
+        cutoff = self.now - STATE_RETENTION
+        self.state = {mid: s for mid, s in self.state.items() if s.get("kickoff", 0) > cutoff}
+        atomic_write(STATE_PATH, json.dumps(self.state, indent=1, sort_keys=True))
+
+async def process_match(session, match, endpoints, buffer, refresh):
+    """Fetches the due data points for a single match into the day's buffer."""
+    mid = match['match_id']
+    tasks = [fetch_sofa_endpoint(session, mid, key, ENDPOINTS[key]) for key in endpoints]
+    results = await asyncio.gather(*tasks)
+
+    for folder, data, status in results:
+        if data:
+            buffer.add(folder, mid, data)
+            refresh.mark_fetched(match, folder)
+        elif status in (200, 404):
+            # No coverage for this match (common in lower leagues); errors and throttling are retried next run
+            refresh.mark_fetched(match, folder, missing=True)
+
+# --- PIPELINE ---
+class DayWork:
+    """One day moving through the stages"""
+
+    def __init__(self, offset, now):
+        target = now + timedelta(days=offset)
+        self.offset = offset
+        self.day = target.strftime('%Y%m%d')
+        self.date_query = target.strftime('%Y-%m-%d')
+        self.events = []
+        self.fixtures = []
+
+# End of input marker, passed from stage to stage once every worker of a stage is done
+DONE = object()
+
+class Ingest:
+    """The stages of one run over a shared session and store.
+
+    Each stage handler takes a DayWork and returns it for the next stage, or None when there is
+    nothing more to do for that day.
+    """
+
+    def __init__(self, session, store, metrics, stages):
+        self.session = session
+        self.store = store
+        self.metrics = metrics
+        self.refresh = RefreshScheduler() if "endpoints" in stages else None
+        self.steps = []
+        if "schedule" in stages:
+            self.steps += [("schedule", self.fetch_schedule), ("normalize", self.normalize)]
+        else:
+            self.steps.append(("load", self.load_stored))
+        if "tv" in stages:
+            self.steps.append(("tv", self.resolve_tv))
+        if "schedule" in stages or "tv" in stages:
+            self.steps.append(("store", self.save_fixtures))
+        if "endpoints" in stages:
+            self.steps.append(("endpoints", self.fetch_endpoints))
+        self.stats = {name: {"days": 0, "dropped": 0, "errors": 0, "busy_s": 0.0} for name, _ in self.steps}
+
+    async def fetch_schedule(self, work):
+        # The inverse feed is the fallback when the main one is blocked or empty
+        for suffix in ("", "/inverse"):
+            data = await fetch_json(self.session, f"{SCHEDULE_API}/sport/football/scheduled-events/{work.date_query}{suffix}", timeout=30)
+            if data and data.get('events'):
+                work.events = data['events']
+                print(f"{work.date_query}: {len(work.events)} fixtures scheduled")
+                return work
+        print(f"No events found for {work.date_query}")
+        return None
+
+    async def normalize(self, work):
+        """Scheduled events to fixture records; a known venue (or the lack of one) is kept while teams and
+        kickoff are unchanged"""
+        # What the store knows about these matches from the last run of this day, by match id
+        previous = {m['match_id']: m for m in self.store.fixtures_for_day(work.day)}
+        fixtures = []
+        for ev in work.events:
+            try:
+                record = {
+                    "match_id": ev.get('id'),
+                    "kickoff": ev.get('startTimestamp'),
+                    "fixture": f"{ev['homeTeam']['name']} vs {ev['awayTeam']['name']}",
+                    "league_id": ev.get('tournament', {}).get('uniqueTournament', {}).get('id', 0),
+                    "league": ev.get('tournament', {}).get('name', 'Unknown'),
+                }
+            except (KeyError, TypeError):
+                continue
+            # notstarted, postponed, canceled, ...; the endpoint stage skips called-off matches
+            status = (ev.get('status') or {}).get('type')
+            if status:
+                record["status"] = status
+            venue = (ev.get('venue') or {}).get('name')
+            prev = previous.get(record['match_id'])
+            unchanged = prev and prev['kickoff'] == record['kickoff'] and prev['fixture'] == record['fixture']
+            if not venue and unchanged and known_venue(prev.get('venue')):
+                venue = prev['venue']
+            if venue:
+                record["venue"] = venue
+            elif unchanged and venue_checked(prev):
+                record["no_venue"] = True
+            fixtures.append(record)
+        work.fixtures, work.events = fixtures, []
+        return work
+
+    async def load_stored(self, work):
+        work.fixtures = self.store.fixtures_for_day(work.day)
+        if not work.fixtures:
+            print(f"Skipping {work.day}, no match list found.")
+            return None
+        return work
+
+    async def resolve_tv(self, work):
+        """Venue (when still unknown) and TV listings for every fixture of the day"""
+        async def complete(record):
+            if not known_venue(record.get('venue')):
+                # An event without a venue is marked, so unchanged fixtures are not asked again; a failed
+                # lookup leaves both out and the next run retries (the match page shows "To Be Announced")
+                venue = "" if venue_checked(record) else await fetch_venue(self.session, record['match_id'])
+                record.pop('venue', None)
+                if venue:
+                    record['venue'] = venue
+                elif venue == "":
+                    record['no_venue'] = True
+            record['tv_channels'] = await get_tv_data(self.session, record['match_id'])
+
+        print(f"{work.date_query}: resolving TV data for {len(work.fixtures)} fixtures...")
+        await asyncio.gather(*(complete(r) for r in work.fixtures))
+        return work
+
+    async def save_fixtures(self, work):
+        # Merged with what the store already has: a record without venue or TV does not erase them
+        self.store.upsert_matches(work.fixtures, day=work.day)
+        path = self.store.export_fixtures(work.day)
+        self.metrics.count("fixtures", len(work.fixtures))
+        print(f"DONE: Generated {path}")
+        return work
+
+    async def fetch_endpoints(self, work):
+        """The due endpoints of every match of the day, from the store's current listing"""
+        matches = self.store.fixtures_for_day(work.day)
+        due = []
+        for m in matches:
+            if 'match_id' in m and m.get('kickoff'):
+                endpoints = self.refresh.due_endpoints(m)
+                if endpoints:
+                    due.append((m, endpoints))
+
+        self.metrics.count("matches", len(matches))
+        self.metrics.count("matches_due", len(due))
+        self.metrics.count("requests_due", sum(len(e) for _, e in due))
+        print(f"--- Processing {len(due)} of {len(matches)} matches for {work.day} "
+              f"({sum(len(e) for _, e in due)} requests due) ---")
+        buffer = DayBuffer(work.day, self.store)
+        try:
+            # The request scheduler paces these, no manual batching needed
+            await asyncio.gather(*(process_match(self.session, m, endpoints, buffer, self.refresh) for m, endpoints in due))
+        finally:
+            # One write per endpoint file per day, even if the run is cut short
+            buffer.flush()
+            self.refresh.save()
+        return work
+
+    async def _worker(self, name, handler, inbox, outbox, remaining):
+        stats = self.stats[name]
+        while True:
+            work = await inbox.get()
+            if work is DONE:
+                # Hand the marker to this stage's next worker; the last one passes it downstream
+                remaining[0] -= 1
+                if remaining[0]:
+                    await inbox.put(DONE)
+                elif outbox is not None:
+                    await outbox.put(DONE)
+                return
+            started = time.perf_counter()
+            day = work.day
+            try:
+                work = await handler(work)
+            except Exception as e:
+                # One bad day must not stall the pipeline
+                print(f"Stage {name} failed for {day}: {e}")
+                stats["errors"] += 1
+                work = None
+            stats["busy_s"] += time.perf_counter() - started
+            stats["days"] += 1
+            if work is None:
+                stats["dropped"] += 1
+            elif outbox is not None:
+                await outbox.put(work)
+
+    async def run(self, offsets, workers=STAGE_WORKERS, queue_size=QUEUE_SIZE):
+        now = datetime.now()
+        queues = [asyncio.Queue(queue_size) for _ in self.steps]
+
+        async def feed():
+            for offset in offsets:
+                await queues[0].put(DayWork(offset, now))
+            await queues[0].put(DONE)
+
+        tasks = [feed()]
+        for n, (name, handler) in enumerate(self.steps):
+            outbox = queues[n + 1] if n + 1 < len(queues) else None
+            remaining = [workers]
+            tasks += [self._worker(name, handler, queues[n], outbox, remaining) for _ in range(workers)]
+        await asyncio.gather(*tasks)
+
+    def report(self):
+        return "Stages: " + ", ".join(
+            f"{name} {s['days']} days ({s['dropped']} dropped, {s['errors']} failed, {s['busy_s']:.1f}s busy)"
+            for name, s in self.stats.items())
+
+def parse_stages(value):
+    stages = [s.strip() for s in value.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown or not stages:
+        raise argparse.ArgumentTypeError(f"stages are a comma-separated subset of {','.join(STAGES)}")
+    return stages
+
+async def main(argv=None, name="ingest"):
+    """Run the selected stages; name is the metrics report's name (the old scripts keep theirs)"""
+    parser = argparse.ArgumentParser(description="Fetch SofaScore schedules, TV listings and match data into date/ and data/")
+    parser.add_argument("--stages", type=parse_stages, default=list(STAGES),
+                        help=f"comma-separated stages to run (default: {','.join(STAGES)})")
+    parser.add_argument("--from", dest="start", type=int, default=-1, help="first day, relative to today (default: -1)")
+    parser.add_argument("--to", dest="end", type=int, default=7, help="last day, relative to today (default: 7)")
+    parser.add_argument("--workers", type=int, default=STAGE_WORKERS, help="days each stage works on at once")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE, help="days waiting between two stages")
+    args = parser.parse_args(argv)
+
+    cache = ResponseCache()
+    scheduler = RequestScheduler()
+    store = MatchStore()
+    metrics = RunMetrics(name)
+    if "tv" in args.stages:
+        channel_names.load()
+    with metrics.stage("sync"):
+        # Pick up fixture lists (and, for the endpoint stage, data files) committed since this store last saw them
+        store.sync_files(payloads="endpoints" in args.stages)
+    with metrics.stage("ingest"):
+        async with AsyncSession() as raw_session:
+            # Cache hits never touch the network, so the scheduler only sees real requests
+            session = CachedAsyncSession(ScheduledAsyncSession(raw_session, scheduler), cache)
+            ingest = Ingest(session, store, metrics, args.stages)
+            print(f"Ingesting days {args.start:+d}..{args.end:+d}: {' -> '.join(name for name, _ in ingest.steps)}")
+            await ingest.run(range(args.start, args.end + 1), args.workers, args.queue_size)
+    if "tv" in args.stages:
+        channel_names.save()
+        print(channel_names.report())
+        metrics.section("channel_names", dict(channel_names.stats))
+    print(ingest.report())
+    print(scheduler.report())
+    print(cache.report())
+    metrics.section("pipeline", {name: {**s, "busy_s": round(s["busy_s"], 3)} for name, s in ingest.stats.items()})
+    metrics.section("requests", scheduler.summary())
+    metrics.section("http_cache", dict(cache.stats))
+    metrics.write()
+    cache.close()
+    store.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
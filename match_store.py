@@ -0,0 +1,339 @@
+"""SQLite store for fixtures and endpoint payloads.
+
+The scrapers write into it in bulk transactions and build.py reads its matches from it. The
+JSON files in date/ and data/ are still written, as exports of the store, because they are what
+the workflows commit and share with each other:
+
+    date/<day>.json            <- export_fixtures(day)   (listing order of that day's scrape)
+    data/<endpoint>/<day>.json <- export_payloads(endpoint, day)
+
+sync_files() imports any of those files that changed since the store last read or wrote them
+(e.g. pulled from git, or committed by another workflow), so a fresh checkout fills the store.
+Days moved out of date/ into archive packs (see fixture_files.py) drop out of the listings.
+
+A match seen in several sources keeps the freshest record (latest updated_at). A record without
+venue, league id or TV listings, as a schedule-only ingest.py run writes them, does not erase the
+ones already stored.
+
+    python match_store.py import         # sync date/ and data/ into the store
+    python match_store.py export         # rewrite date/ and data/ from the store
+"""
+import argparse
+import glob
+import json
+import os
+import sqlite3
+import time
+
+from data_index import ENDPOINTS, file_sha1, write_indexed
+from fixture_files import load_fixtures, save_fixtures
+
+STORE_PATH = ".cache/matches.sqlite"
+DATE_DIR = "date"
+DATA_DIR = "data"
+
+# Fixture keys with their own columns; anything else is kept in matches.extra
+FIXTURE_KEYS = ("match_id", "kickoff", "fixture", "league_id", "league", "venue", "tv_channels")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leagues (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS channels (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS matches (
+    match_id INTEGER PRIMARY KEY,
+    kickoff INTEGER NOT NULL,
+    fixture TEXT NOT NULL,
+    league INTEGER REFERENCES leagues (id),
+    league_id INTEGER,
+    venue TEXT,
+    has_tv INTEGER NOT NULL DEFAULT 0,
+    extra TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS matches_kickoff ON matches (kickoff);
+CREATE INDEX IF NOT EXISTS matches_league_id ON matches (league_id);
+CREATE INDEX IF NOT EXISTS matches_updated ON matches (updated_at);
+
+-- date/<day>.json membership, in scrape order
+CREATE TABLE IF NOT EXISTS listings (
+    day TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    match_id INTEGER NOT NULL REFERENCES matches (match_id),
+    PRIMARY KEY (day, match_id)
+);
+CREATE INDEX IF NOT EXISTS listings_match ON listings (match_id);
+
+CREATE TABLE IF NOT EXISTS broadcasts (
+    match_id INTEGER NOT NULL REFERENCES matches (match_id),
+    country TEXT NOT NULL,
+    channel_id INTEGER NOT NULL REFERENCES channels (id),
+    position INTEGER NOT NULL,
+    PRIMARY KEY (match_id, country, channel_id)
+);
+CREATE INDEX IF NOT EXISTS broadcasts_channel ON broadcasts (channel_id);
+
+-- data/<endpoint>/<day>.json entries; rowid keeps first-stored order for the export
+CREATE TABLE IF NOT EXISTS payloads (
+    endpoint TEXT NOT NULL,
+    day TEXT NOT NULL,
+    match_id INTEGER NOT NULL,
+    body TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (endpoint, day, match_id)
+);
+CREATE INDEX IF NOT EXISTS payloads_match ON payloads (match_id, endpoint);
+CREATE INDEX IF NOT EXISTS payloads_updated ON payloads (updated_at);
+
+-- Content hash of every JSON file the store imported or exported, so sync_files() skips them
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    sha1 TEXT NOT NULL
+);
+"""
+
+UPSERT_MATCH = """
+INSERT INTO matches (match_id, kickoff, fixture, league, league_id, venue, has_tv, extra, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (match_id) DO UPDATE SET
+    kickoff = excluded.kickoff,
+    fixture = excluded.fixture,
+    league = excluded.league,
+    league_id = COALESCE(excluded.league_id, matches.league_id),
+    venue = COALESCE(excluded.venue, matches.venue),
+    has_tv = MAX(excluded.has_tv, matches.has_tv),
+    extra = COALESCE(excluded.extra, matches.extra),
+    updated_at = excluded.updated_at
+WHERE excluded.updated_at >= matches.updated_at
+"""
+
+UPSERT_PAYLOAD = """
+INSERT INTO payloads (endpoint, day, match_id, body, updated_at) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (endpoint, day, match_id) DO UPDATE SET
+    body = excluded.body,
+    updated_at = excluded.updated_at
+WHERE excluded.updated_at >= payloads.updated_at
+"""
+
+MATCH_COLUMNS = "m.match_id, m.kickoff, m.fixture, l.name, m.league_id, m.venue, m.has_tv, m.extra"
+
+
+def day_of(path):
+    return os.path.basename(path)[:-len(".json")]
+
+
+class MatchStore:
+    def __init__(self, path=STORE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.db.commit()
+        self._ids = {"leagues": {}, "channels": {}}
+
+    def close(self):
+        self.db.close()
+
+    def _name_id(self, table, name):
+        """Row id for a league/channel name, inserting it on first use"""
+        ids = self._ids[table]
+        if name not in ids:
+            self.db.execute(f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", (name,))
+            ids[name] = self.db.execute(f"SELECT id FROM {table} WHERE name = ?", (name,)).fetchone()[0]
+        return ids[name]
+
+    # --- writes ---
+    def _upsert_match(self, m, updated_at):
+        """Upsert one fixture record; returns False if the store already holds a fresher one"""
+        extra = {k: v for k, v in m.items() if k not in FIXTURE_KEYS}
+        league = self._name_id("leagues", m.get("league", "Other Football"))
+        cur = self.db.execute(UPSERT_MATCH, (
+            m["match_id"], int(m["kickoff"]), m["fixture"], league, m.get("league_id"), m.get("venue"),
+            1 if "tv_channels" in m else 0, json.dumps(extra, ensure_ascii=False) if extra else None,
+            updated_at,
+        ))
+        if cur.rowcount == 0:
+            return False
+        if "tv_channels" in m:
+            self.db.execute("DELETE FROM broadcasts WHERE match_id = ?", (m["match_id"],))
+            rows = []
+            for c in m["tv_channels"]:
+                for ch in c["channels"]:
+                    rows.append((m["match_id"], c["country"], self._name_id("channels", ch), len(rows)))
+            self.db.executemany("INSERT OR IGNORE INTO broadcasts VALUES (?, ?, ?, ?)", rows)
+        return True
+
+    def upsert_matches(self, matches, day=None, updated_at=None):
+        """Store scraped fixtures in one transaction.
+
+        With day, they also become the complete listing of date/<day>.json, in the given order.
+        Returns how many records were stored (older ones than the store's are skipped).
+        """
+        updated_at = updated_at or time.time()
+        stored = 0
+        with self.db:
+            for m in matches:
+                if m.get("match_id") and m.get("kickoff"):
+                    stored += self._upsert_match(m, updated_at)
+            if day is not None:
+                self.db.execute("DELETE FROM listings WHERE day = ?", (day,))
+                ids = list(dict.fromkeys(m["match_id"] for m in matches if m.get("match_id") and m.get("kickoff")))
+                self.db.executemany("INSERT INTO listings VALUES (?, ?, ?)",
+                                    [(day, n, mid) for n, mid in enumerate(ids)])
+        return stored
+
+    def upsert_payloads(self, endpoint, day, payloads, updated_at=None):
+        """Store {match_id: payload} for one data/<endpoint>/<day>.json in one transaction"""
+        updated_at = updated_at or time.time()
+        with self.db:
+            self.db.executemany(UPSERT_PAYLOAD, [
+                (endpoint, day, int(mid), json.dumps(data, separators=(",", ":")), updated_at)
+                for mid, data in payloads.items()
+            ])
+
+    # --- queries ---
+    def _records(self, rows):
+        """Fixture dicts (the date/*.json layout) for rows of MATCH_COLUMNS"""
+        rows = list(rows)
+        tv = {}
+        ids = [r[0] for r in rows if r[6]]
+        # Broadcasts for all requested matches in one query per 500 ids (SQLite's variable limit)
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            for mid, country, channel in self.db.execute(
+                    f"SELECT b.match_id, b.country, c.name FROM broadcasts b JOIN channels c ON c.id = b.channel_id "
+                    f"WHERE b.match_id IN ({','.join('?' * len(chunk))}) ORDER BY b.match_id, b.position", chunk):
+                countries = tv.setdefault(mid, {})
+                countries.setdefault(country, []).append(channel)
+
+        records = []
+        for mid, kickoff, fixture, league, league_id, venue, has_tv, extra in rows:
+            m = {"match_id": mid, "kickoff": kickoff, "fixture": fixture}
+            if league_id is not None:
+                m["league_id"] = league_id
+            m["league"] = league
+            if venue is not None:
+                m["venue"] = venue
+            if has_tv:
+                m["tv_channels"] = [{"country": c, "channels": chs} for c, chs in tv.get(mid, {}).items()]
+            if extra:
+                m.update(json.loads(extra))
+            records.append(m)
+        return records
+
+    def matches(self, start=None, end=None):
+        """Listed matches with start <= kickoff < end (unbounded by default), in kickoff order"""
+        return self._records(self.db.execute(
+            f"SELECT {MATCH_COLUMNS} FROM matches m JOIN leagues l ON l.id = m.league "
+            f"WHERE m.kickoff >= ? AND m.kickoff < ? AND m.match_id IN (SELECT match_id FROM listings) "
+            f"ORDER BY m.kickoff, m.match_id",
+            (start if start is not None else -2 ** 62, end if end is not None else 2 ** 62)))
+
+    def fixtures_for_day(self, day):
+        """The fixture list of date/<day>.json, in listing order ([] if the day is unknown)"""
+        return self._records(self.db.execute(
+            f"SELECT {MATCH_COLUMNS} FROM listings s JOIN matches m ON m.match_id = s.match_id "
+            f"JOIN leagues l ON l.id = m.league WHERE s.day = ? ORDER BY s.position", (day,)))
+
+    def listed_days(self):
+        """{match_id: [days]} of the date/ files each match is listed in"""
+        out = {}
+        for day, mid in self.db.execute("SELECT day, match_id FROM listings ORDER BY day"):
+            out.setdefault(mid, []).append(day)
+        return out
+
+    def days(self):
+        return [d for d, in self.db.execute("SELECT DISTINCT day FROM listings ORDER BY day")]
+
+    def payloads_for_day(self, endpoint, day):
+        return {str(mid): json.loads(body) for mid, body in self.db.execute(
+            "SELECT match_id, body FROM payloads WHERE endpoint = ? AND day = ? ORDER BY rowid", (endpoint, day))}
+
+    # --- JSON files ---
+    def _file_known(self, path, sha1):
+        row = self.db.execute("SELECT sha1 FROM files WHERE path = ?", (path,)).fetchone()
+        return row is not None and row[0] == sha1
+
+    def _remember_file(self, path):
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO files VALUES (?, ?)", (path, file_sha1(path)))
+
+    def sync_files(self, date_dir=DATE_DIR, data_dir=DATA_DIR, fixtures=True, payloads=True):
+        """Import the date/ and data/ files that changed since the store last saw them.
+
+        A changed file is news to this store, so its records count as fresh as of now. Returns the
+        number of files imported.
+        """
+        paths = sorted(glob.glob(os.path.join(date_dir, "*.json"))) if fixtures else []
+        if payloads:
+            for endpoint in ENDPOINTS:
+                paths += sorted(p for p in glob.glob(os.path.join(data_dir, endpoint, "*.json"))
+                                if not p.endswith(".idx.json"))
+        now = time.time()
+        imported = 0
+        if fixtures:
+            # A day whose file left date/ (moved to an archive pack) is no longer listed
+            known = [p for p, in self.db.execute("SELECT path FROM files WHERE path LIKE ?", (os.path.join(date_dir, "%"),))]
+            with self.db:
+                for path in known:
+                    if os.path.dirname(path) == date_dir and not os.path.exists(path):
+                        self.db.execute("DELETE FROM listings WHERE day = ?", (day_of(path),))
+                        self.db.execute("DELETE FROM files WHERE path = ?", (path,))
+        for path in paths:
+            sha1 = file_sha1(path)
+            if self._file_known(path, sha1):
+                continue
+            try:
+                if os.path.dirname(path) == date_dir:
+                    self.upsert_matches(load_fixtures(path), day=day_of(path), updated_at=now)
+                else:
+                    with open(path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                    self.upsert_payloads(os.path.basename(os.path.dirname(path)), day_of(path), data, updated_at=now)
+            except Exception as e:
+                print(f"Warning: Failed to import {path}: {e}")
+                continue
+            with self.db:
+                self.db.execute("INSERT OR REPLACE INTO files VALUES (?, ?)", (path, sha1))
+            imported += 1
+        return imported
+
+    def export_fixtures(self, day, date_dir=DATE_DIR):
+        path = os.path.join(date_dir, f"{day}.json")
+        save_fixtures(path, self.fixtures_for_day(day))
+        self._remember_file(path)
+        return path
+
+    def export_payloads(self, endpoint, day, data_dir=DATA_DIR):
+        path = os.path.join(data_dir, endpoint, f"{day}.json")
+        write_indexed(path, self.payloads_for_day(endpoint, day))
+        self._remember_file(path)
+        return path
+
+    def export_all(self, date_dir=DATE_DIR, data_dir=DATA_DIR):
+        for day in self.days():
+            self.export_fixtures(day, date_dir)
+        for endpoint, day in self.db.execute("SELECT DISTINCT endpoint, day FROM payloads").fetchall():
+            self.export_payloads(endpoint, day, data_dir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync the match store with the date/ and data/ JSON files")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("--store", default=STORE_PATH)
+    args = parser.parse_args()
+
+    store = MatchStore(args.store)
+    if args.command == "import":
+        print(f"Imported {store.sync_files()} changed files into {args.store}")
+    else:
+        store.export_all()
+        print(f"Exported {len(store.days())} fixture days from {args.store}")
+    store.close()
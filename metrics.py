@@ -0,0 +1,149 @@
+"""Opt-in run metrics for build.py and the scrapers.
+
+Set METRICS_DIR to get a JSON report per run in that directory (<script>-<UTC time>.json) with
+per-stage wall time, CPU time and peak RSS, the run's counters and, for the scrapers, per-endpoint
+request statistics. PROFILE_STAGE=<stage> also writes a cProfile dump of that stage next to the
+report (open it with `python -m pstats` or snakeviz). build.py takes --metrics/--profile instead.
+"""
+import cProfile
+import json
+import os
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None
+
+# Upper bounds (ms) of the request latency histogram buckets; the last bucket is everything slower
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def children_cpu():
+    """CPU seconds of finished child processes (build workers)"""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class RunMetrics:
+    """Stage timings and counters of one run; write() does nothing unless a metrics dir is set."""
+
+    def __init__(self, name, out_dir=None, profile_stage=None):
+        self.name = name
+        self.out_dir = out_dir or os.environ.get("METRICS_DIR")
+        self.profile_stage = profile_stage or os.environ.get("PROFILE_STAGE")
+        self.started = time.time()
+        self.stamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(self.started))
+        self.stages = []
+        self.counters = Counter()
+        self.sections = {}
+
+    def _path(self, suffix):
+        return os.path.join(self.out_dir or ".", f"{self.name}-{self.stamp}{suffix}")
+
+    @contextmanager
+    def stage(self, name):
+        wall, cpu, child_cpu = time.perf_counter(), time.process_time(), children_cpu()
+        profiler = None
+        if name == self.profile_stage:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler:
+                profiler.disable()
+                os.makedirs(self.out_dir or ".", exist_ok=True)
+                profiler.dump_stats(self._path(f".{name}.prof"))
+            self.stages.append({
+                "stage": name,
+                "wall_s": round(time.perf_counter() - wall, 4),
+                "cpu_s": round(time.process_time() - cpu, 4),
+                "children_cpu_s": round(children_cpu() - child_cpu, 4),
+                "peak_rss_mb": peak_rss_mb(),
+            })
+
+    def count(self, key, n=1):
+        self.counters[key] += n
+
+    def section(self, name, data):
+        self.sections[name] = data
+
+    def write(self):
+        """Write the JSON report if enabled; returns its path or None"""
+        if not self.out_dir:
+            return None
+        report = {
+            "run": self.name,
+            "started": self.stamp,
+            "argv": sys.argv[1:],
+            "wall_s": round(time.time() - self.started, 3),
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": self.stages,
+            "counters": dict(self.counters),
+            **self.sections,
+        }
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = self._path(".json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1, sort_keys=True)
+        print(f"Metrics: {path}")
+        return path
+
+
+class RequestStats:
+    """Per-endpoint-family request counts, status codes, retries, bytes and a latency histogram."""
+
+    def __init__(self):
+        self.endpoints = {}
+
+    def _family(self, family):
+        if family not in self.endpoints:
+            self.endpoints[family] = {
+                "requests": 0, "retries": 0, "errors": 0, "bytes": 0,
+                "status": Counter(), "latency_ms": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+                "latency_total_s": 0.0,
+            }
+        return self.endpoints[family]
+
+    def record(self, family, status, latency, nbytes):
+        """One finished attempt; status None means it raised"""
+        s = self._family(family)
+        s["requests"] += 1
+        s["latency_total_s"] += latency
+        if status is None:
+            s["errors"] += 1
+        else:
+            s["status"][str(status)] += 1
+            s["bytes"] += nbytes
+        ms = latency * 1000
+        bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if ms <= bound), len(LATENCY_BUCKETS_MS))
+        s["latency_ms"][bucket] += 1
+
+    def retry(self, family):
+        self._family(family)["retries"] += 1
+
+    def as_dict(self):
+        out = {}
+        for family, s in sorted(self.endpoints.items()):
+            out[family] = {
+                **s,
+                "status": dict(s["status"]),
+                "latency_ms": dict(zip([f"<={b}" for b in LATENCY_BUCKETS_MS] + ["slower"], s["latency_ms"])),
+                "latency_total_s": round(s["latency_total_s"], 3),
+            }
+        return out
@@ -0,0 +1,148 @@
+"""Versioned site releases behind a dist -> releases/<id> symlink.
+
+build.py writes each build into releases/<id>.tmp/ with plain writes (nothing serves it yet),
+renames it to releases/<id> when it is complete and publishes it by replacing the dist symlink,
+which is a single atomic rename: readers see the old tree or the new one, never neither. The
+newest KEEP_RELEASES releases stay around for rollback; older ones (and .tmp leftovers of crashed
+builds) are deleted by a detached child process, so the build does not wait for the rmtree.
+
+    python releases.py list              # releases, newest first; * marks the published one
+    python releases.py rollback [--to ID] # publish the previous (or a given) release
+    python releases.py gc [--keep N]      # delete all but the newest N releases
+
+Unchanged pages are hardlinked from the published release into the next one, so a kept release
+costs little more than the pages that changed in it.
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+
+RELEASES_DIR = "releases"
+LINK = "dist"
+KEEP_RELEASES = 3
+PARTIAL = ".tmp"
+# Releases being deleted are renamed to this prefix first, so GC runs never race on one directory
+TRASH = ".trash-"
+
+
+class ReleaseManager:
+    def __init__(self, root=RELEASES_DIR, link=LINK, keep=KEEP_RELEASES):
+        self.root = root
+        self.link = link
+        self.keep = keep
+
+    def releases(self):
+        """Finished release ids, newest first (ids sort by build time)"""
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return []
+        return sorted((n for n in names if not n.endswith(PARTIAL) and not n.startswith(TRASH)
+                       and os.path.isdir(os.path.join(self.root, n))), reverse=True)
+
+    def current(self):
+        """Id of the published release, or None"""
+        try:
+            target = os.readlink(self.link)
+        except OSError:  # missing, or still a plain directory from before releases
+            return None
+        return os.path.basename(os.path.normpath(target))
+
+    def start(self, build_id):
+        """Create releases/<build_id>.tmp for a new build and return its path"""
+        os.makedirs(self.root, exist_ok=True)
+        # Leftovers of a build that crashed before publishing
+        for name in os.listdir(self.root):
+            if name.endswith(PARTIAL):
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+        path = os.path.join(self.root, self._free_id(build_id) + PARTIAL)
+        os.makedirs(path)
+        return path
+
+    def _free_id(self, base):
+        """base, or base-2, base-3, ... if a release of that id already exists"""
+        release_id, n = base, 1
+        while os.path.exists(os.path.join(self.root, release_id)):
+            n += 1
+            release_id = f"{base}-{n}"
+        return release_id
+
+    def finish(self, path):
+        """Mark a finished build as a release; returns its id"""
+        release_id = os.path.basename(path)[:-len(PARTIAL)]
+        os.rename(path, os.path.join(self.root, release_id))
+        return release_id
+
+    def publish(self, release_id):
+        """Point the link at a release in one atomic rename"""
+        if os.path.isdir(self.link) and not os.path.islink(self.link):
+            # The old dist/ directory (or one a checkout or cache restore recreated) becomes a release
+            # of its own, under a free id so a repeat migration never collides with an earlier one
+            os.makedirs(self.root, exist_ok=True)
+            os.rename(self.link, os.path.join(self.root, self._free_id("0-legacy")))
+        tmp_link = f"{self.link}.{os.getpid()}{PARTIAL}"
+        target = os.path.join(os.path.relpath(self.root, os.path.dirname(self.link) or "."), release_id)
+        os.symlink(target, tmp_link)
+        os.replace(tmp_link, self.link)
+
+    def rollback(self, release_id=None):
+        """Publish the given release, or the one before the published one; returns its id"""
+        releases = self.releases()
+        current = self.current()
+        if release_id is None:
+            older = [r for r in releases if current is None or r < current]
+            if not older:
+                raise SystemExit("No older release to roll back to")
+            release_id = older[0]
+        elif release_id not in releases:
+            raise SystemExit(f"No release {release_id} in {self.root}/")
+        self.publish(release_id)
+        return release_id
+
+    def collect(self):
+        """Delete every release but the newest `keep` and the published one; returns their ids"""
+        current = self.current()
+        doomed = [r for r in self.releases()[self.keep:] if r != current]
+        for release_id in doomed:
+            trash = os.path.join(self.root, TRASH + release_id)
+            try:
+                os.rename(os.path.join(self.root, release_id), trash)
+            except OSError:
+                continue  # another GC got there first
+            shutil.rmtree(trash, ignore_errors=True)
+        # Trash a killed GC left behind
+        for name in os.listdir(self.root):
+            if name.startswith(TRASH):
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+        return doomed
+
+    def collect_in_background(self):
+        """Run collect() in a detached child process that outlives this one"""
+        return subprocess.Popen([sys.executable, os.path.abspath(__file__), "gc", "--keep", str(self.keep),
+                                 "--root", self.root, "--link", self.link],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List, roll back and garbage-collect site releases")
+    parser.add_argument("command", choices=["list", "rollback", "gc"])
+    parser.add_argument("--to", metavar="ID", help="release to roll back to (default: the previous one)")
+    parser.add_argument("--keep", type=int, default=KEEP_RELEASES, help="releases gc keeps")
+    parser.add_argument("--root", default=RELEASES_DIR)
+    parser.add_argument("--link", default=LINK)
+    args = parser.parse_args()
+
+    manager = ReleaseManager(args.root, args.link, args.keep)
+    if args.command == "list":
+        current = manager.current()
+        for release_id in manager.releases():
+            print(("* " if release_id == current else "  ") + release_id)
+    elif args.command == "rollback":
+        # The build manifest names the release it describes, so the next --incremental build
+        # notices the switch and renders everything
+        print(f"Published {manager.rollback(args.to)}")
+    else:
+        removed = manager.collect()
+        print(f"Removed {len(removed)} releases")
@@ -0,0 +1,161 @@
+import asyncio
+import random
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from http_cache import endpoint_family
+from metrics import RequestStats
+
+# --- CONFIGURATION ---
+MAX_CONCURRENCY = 16     # requests in flight across all hosts
+PER_HOST_CONCURRENCY = 8
+RATE = 8.0               # requests per second (token bucket refill)
+BURST = 8                # token bucket size
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5       # seconds, doubled on every retry
+BACKOFF_CAP = 30.0
+TARGET_LATENCY = 2.0     # seconds; slower answers shrink the concurrency window
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RequestScheduler:
+    """Shared politeness budget for SofaScore requests.
+
+    Caps requests in flight globally and per host, spaces them with a token bucket, and retries
+    transient failures (exceptions, 429 and 5xx) with jittered exponential backoff. The global
+    window grows by one request per window's worth of fast successes and halves on errors or slow
+    answers; a 429 also halves the request rate, which then recovers gradually.
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, per_host=PER_HOST_CONCURRENCY, rate=RATE,
+                 burst=BURST, max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE,
+                 backoff_cap=BACKOFF_CAP, target_latency=TARGET_LATENCY):
+        self.max_concurrency = max_concurrency
+        self.per_host = per_host
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.target_latency = target_latency
+
+        self.window = float(min(4, max_concurrency))
+        self.active = 0
+        self.host_active = defaultdict(int)
+        self._slots = None  # asyncio.Condition, created inside the running loop
+        self.tokens = float(burst)
+        self.refilled_at = time.monotonic()
+
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "throttled": 0, "errors": 0}
+        self.endpoints = RequestStats()
+
+    # --- concurrency window ---
+    async def _acquire(self, host):
+        if self._slots is None:
+            self._slots = asyncio.Condition()
+        async with self._slots:
+            await self._slots.wait_for(
+                lambda: self.active < int(self.window) and self.host_active[host] < self.per_host)
+            self.active += 1
+            self.host_active[host] += 1
+
+    async def _release(self, host):
+        async with self._slots:
+            self.active -= 1
+            self.host_active[host] -= 1
+            self._slots.notify_all()
+
+    # --- token bucket ---
+    async def _take_token(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+            self.refilled_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def _record(self, latency, ok, throttled=False):
+        if ok and latency <= self.target_latency:
+            self.window = min(self.max_concurrency, self.window + 1 / self.window)
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+        elif not ok or latency > 2 * self.target_latency:
+            self.window = max(1.0, self.window / 2)
+        if throttled:
+            self.rate = max(self.max_rate / 16, self.rate / 2)
+
+    def _backoff(self, attempt, res=None):
+        delay = min(self.backoff_cap, self.backoff_base * 2 ** attempt)
+        retry_after = res.headers.get("Retry-After") if res is not None and res.headers else None
+        if retry_after and str(retry_after).isdigit():
+            delay = max(delay, float(retry_after))
+        # Jitter around the nominal delay so retries from one burst do not line up
+        return delay * random.uniform(0.5, 1.5)
+
+    async def request(self, send, url):
+        """Run send() (a coroutine factory issuing one request for url) under the budget, with retries.
+
+        Returns the last response; re-raises the last exception if every attempt failed with one.
+        """
+        host = urlsplit(url).netloc
+        family = endpoint_family(url)[0]
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(host)
+            res, error = None, None
+            started = time.monotonic()
+            try:
+                await self._take_token()
+                started = time.monotonic()
+                self.stats["requests"] += 1
+                res = await send()
+            except Exception as e:
+                error = e
+            finally:
+                await self._release(host)
+
+            latency = time.monotonic() - started
+            self.endpoints.record(family, None if res is None else res.status_code, latency,
+                                  0 if res is None else len(res.content or b""))
+            retryable = error is not None or res.status_code in RETRY_STATUSES
+            throttled = res is not None and res.status_code == 429
+            if throttled:
+                self.stats["throttled"] += 1
+            elif retryable:
+                self.stats["errors"] += 1
+            self._record(latency, not retryable, throttled)
+
+            if not retryable:
+                return res
+            if attempt == self.max_retries:
+                self.stats["failures"] += 1
+                if error is not None:
+                    raise error
+                return res
+            self.stats["retries"] += 1
+            self.endpoints.retry(family)
+            await asyncio.sleep(self._backoff(attempt, res))
+
+    def report(self):
+        s = self.stats
+        return (f"Requests: {s['requests']} sent, {s['retries']} retries, {s['throttled']} throttled (429), "
+                f"{s['errors']} errors, {s['failures']} gave up; window {self.window:.1f}, rate {self.rate:.1f}/s")
+
+    def summary(self):
+        """Totals and per-endpoint statistics for the metrics report"""
+        return {"totals": {**self.stats, "window": round(self.window, 2), "rate": round(self.rate, 2)},
+                "endpoints": self.endpoints.as_dict()}
+
+
+class ScheduledAsyncSession:
+    """Wraps an AsyncSession so every get() goes through a RequestScheduler."""
+
+    def __init__(self, session, scheduler):
+        self.session = session
+        self.scheduler = scheduler
+
+    async def get(self, url, **kwargs):
+        return await self.scheduler.request(lambda: self.session.get(url, **kwargs), url)
@@ -0,0 +1,80 @@
+"""Prefix-searchable inverted index over team names, leagues and channels, for client-side search.
+
+build.py fills a SearchIndex from the same match index the pages are planned from (matches and
+channels of the active window, not the archive) and writes it under dist/api/search/:
+
+    meta.json          {"version", "prefix_len", "docs_per_shard", "docs", "terms": [term shard keys]}
+    docs/<n>.json      docs n*docs_per_shard onwards: ["m", fixture, league, kickoff, path] or ["c", channel, path]
+    terms/<key>.json   {token: [doc ids]} for every token starting with <key> (its first prefix_len characters)
+
+A client tokenizes the query like tokenize(), loads terms/<token[:2]>.json for each query token,
+unions the postings of every indexed token that starts with it, intersects across query tokens
+and then loads only the doc shards holding the hits. Tokens shorter than two characters are not
+indexed.
+"""
+import json
+import os
+import re
+import unicodedata
+
+INDEX_VERSION = 1
+PREFIX_LEN = 2
+DOCS_PER_SHARD = 500
+
+# Letters NFKD does not decompose into ASCII
+_FOLD = str.maketrans({"ø": "o", "ł": "l", "đ": "d", "æ": "ae", "œ": "oe", "ı": "i", "þ": "th", "ð": "d"})
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    """Lowercase ASCII tokens of a name: 'Atlético Madrid' -> ['atletico', 'madrid']"""
+    folded = unicodedata.normalize("NFKD", str(text).casefold().translate(_FOLD))
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    return [t for t in _TOKEN.findall(folded) if len(t) >= PREFIX_LEN]
+
+
+class SearchIndex:
+    def __init__(self):
+        self.matches = {}   # match_id -> doc
+        self.channels = {}  # name -> doc
+
+    def add_match(self, match_id, kickoff, fixture, league, path):
+        self.matches[match_id] = ["m", fixture, league, int(kickoff), path]
+
+    def add_channel(self, name, path):
+        self.channels[name] = ["c", name, path]
+
+    def _docs(self):
+        """Docs in a stable order: matches by kickoff, then channels by name"""
+        docs = [self.matches[mid] for mid in sorted(self.matches, key=lambda mid: (self.matches[mid][3], mid))]
+        return docs + [self.channels[name] for name in sorted(self.channels)]
+
+    def write(self, root):
+        """Write the index under root/ (dist/api/search); returns (docs, term shards)"""
+        docs = self._docs()
+        postings = {}
+        for doc_id, doc in enumerate(docs):
+            # The fixture's " vs " would otherwise post every match under "vs"
+            text = f"{doc[1].replace(' vs ', ' ')} {doc[2]}" if doc[0] == "m" else doc[1]
+            for token in set(tokenize(text)):
+                postings.setdefault(token, []).append(doc_id)
+
+        shards = {}
+        for token in sorted(postings):
+            shards.setdefault(token[:PREFIX_LEN], {})[token] = postings[token]
+
+        for n in range(0, len(docs), DOCS_PER_SHARD):
+            _write_json(os.path.join(root, "docs", f"{n // DOCS_PER_SHARD}.json"), docs[n:n + DOCS_PER_SHARD])
+        for key, terms in shards.items():
+            _write_json(os.path.join(root, "terms", f"{key}.json"), terms)
+        _write_json(os.path.join(root, "meta.json"), {
+            "version": INDEX_VERSION, "prefix_len": PREFIX_LEN, "docs_per_shard": DOCS_PER_SHARD,
+            "docs": len(docs), "terms": sorted(shards),
+        })
+        return len(docs), len(shards)
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
@@ -0,0 +1,82 @@
+"""Sharded, gzipped sitemaps behind a sitemap index, written entry by entry.
+
+sitemap.xml is a sitemap index; the URLs themselves go into sitemap-<n>.xml.gz shards of at most
+50,000 URLs or 50 MB uncompressed (the protocol's limits). Every URL carries the time its page's
+content last changed, which build.py tracks across builds in the manifest, so crawlers only come
+back for pages that actually changed.
+"""
+import gzip
+import hashlib
+import os
+from xml.sax.saxutils import escape
+
+MAX_URLS = 50000
+MAX_BYTES = 50 * 1000 * 1000
+NAMESPACE = "http://www.sitemaps.org/schemas/sitemap/0.9"
+URLSET_OPEN = f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="{NAMESPACE}">'
+URLSET_CLOSE = '</urlset>'
+
+
+class SitemapWriter:
+    """Streams <url> entries into gzipped shards under root/ and writes the index on close().
+
+    A URL seen before is skipped, so the first lastmod given for it wins.
+    """
+
+    def __init__(self, root, domain, max_urls=MAX_URLS, max_bytes=MAX_BYTES):
+        self.root = root
+        self.domain = domain
+        self.max_urls = max_urls
+        self.max_bytes = max_bytes
+        self.seen = set()  # 8-byte digests, not the URLs themselves
+        self.count = 0
+        self.newest = None  # latest lastmod added so far
+        self.shards = []   # [file name, newest lastmod]
+        self._file = None
+        self._urls = self._bytes = 0
+
+    def _open_shard(self):
+        name = f"sitemap-{len(self.shards) + 1}.xml.gz"
+        raw = open(os.path.join(self.root, name), "wb")
+        # mtime=0 and no file name in the header: an unchanged shard is byte-identical between builds
+        self._file = gzip.GzipFile(filename="", mode="wb", compresslevel=9, fileobj=raw, mtime=0)
+        self._raw = raw
+        self._file.write(URLSET_OPEN.encode("utf-8"))
+        self._urls, self._bytes = 0, len(URLSET_OPEN) + len(URLSET_CLOSE)
+        self.shards.append([name, ""])
+
+    def _close_shard(self):
+        self._file.write(URLSET_CLOSE.encode("utf-8"))
+        self._file.close()
+        self._raw.close()
+        self._file = None
+
+    def add(self, url, lastmod):
+        key = hashlib.sha1(url.encode("utf-8")).digest()[:8]
+        if key in self.seen:
+            return
+        self.seen.add(key)
+        entry = f'<url><loc>{escape(url)}</loc><lastmod>{lastmod}</lastmod></url>'.encode("utf-8")
+        if self._file and (self._urls >= self.max_urls or self._bytes + len(entry) > self.max_bytes):
+            self._close_shard()
+        if not self._file:
+            self._open_shard()
+        self._file.write(entry)
+        self._urls += 1
+        self._bytes += len(entry)
+        self.count += 1
+        # W3C datetimes with one fixed offset sort chronologically as strings
+        self.shards[-1][1] = max(self.shards[-1][1], lastmod)
+        self.newest = max(self.newest or lastmod, lastmod)
+
+    def close(self):
+        """Finish the last shard and write sitemap.xml; returns the number of shards"""
+        if self._file:
+            self._close_shard()
+        parts = [f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex xmlns="{NAMESPACE}">']
+        for name, lastmod in self.shards:
+            parts.append(f'<sitemap><loc>{escape(self.domain)}/{name}</loc><lastmod>{lastmod}</lastmod></sitemap>')
+        parts.append('</sitemapindex>')
+        with open(os.path.join(self.root, "sitemap.xml"), "w", encoding="utf-8") as f:
+            f.write("".join(parts))
+        return len(self.shards)
@@ -0,0 +1,71 @@
+import html
+import json
+import re
+
+PLACEHOLDER_RE = re.compile(r'\{\{([A-Z_]+)\}\}')
+# {{NAME_JSON}} is NAME's value escaped for the inside of a JSON string (JSON-LD blocks)
+JSON_SUFFIX = "_JSON"
+
+
+class TemplateError(Exception):
+    pass
+
+
+class Markup(str):
+    """A string that is already HTML and must be inserted as-is (listing rows, menus, ads)."""
+
+
+def json_string(value):
+    """Contents of a JSON string literal for value; '<' is escaped so it cannot close the <script>"""
+    return json.dumps(str(value), ensure_ascii=False)[1:-1].replace("<", "\\u003c")
+
+
+def source_name(key):
+    return key[:-len(JSON_SUFFIX)] if key.endswith(JSON_SUFFIX) else key
+
+
+class Template:
+    """A page template parsed once into literal and placeholder segments.
+
+    render() fills every placeholder in a single join. Plain values are HTML-escaped,
+    Markup values are inserted raw, and a NAME_JSON placeholder gets NAME's value escaped for a
+    JSON string instead. A placeholder without a value is an error.
+    """
+
+    def __init__(self, source, name="<template>", allowed=None):
+        self.source = source
+        self.name = name
+        parts = PLACEHOLDER_RE.split(source)
+        # split() alternates literal, name, literal, name, ..., literal
+        self.literals = parts[0::2]
+        self.names = parts[1::2]
+        self.placeholders = frozenset(self.names)
+        self.sources = frozenset(source_name(key) for key in self.names)
+        if allowed is not None:
+            unknown = {key for key in self.placeholders if source_name(key) not in allowed}
+            if unknown:
+                raise TemplateError(f"{name}: unknown placeholder(s) {', '.join(sorted(unknown))}")
+
+    @classmethod
+    def from_file(cls, path, allowed=None):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(f.read(), name=path, allowed=allowed)
+
+    def render(self, values):
+        missing = self.sources - values.keys()
+        if missing:
+            raise TemplateError(f"{self.name}: no value for {', '.join(sorted(missing))}")
+
+        filled = {}
+        for key in self.placeholders:
+            value = values[source_name(key)]
+            if key.endswith(JSON_SUFFIX):
+                filled[key] = json_string(value)
+            else:
+                filled[key] = value if isinstance(value, Markup) else html.escape(str(value))
+
+        out = [self.literals[0]]
+        for key, literal in zip(self.names, self.literals[1:]):
+            out.append(filled[key])
+            out.append(literal)
+        return "".join(out)